@@ -0,0 +1,42 @@
+"""Time needed to build a tree of 100k options, adding them one by one
+with the addXxx helpers and in bulk with add_children.
+
+    python benchmarks/bench_build.py [nodes]
+"""
+import sys
+import time
+
+from easyconfig2.easyconfig import EasyConfig2
+from easyconfig2.easynodes import EasyInputBox
+
+
+def build_one_by_one(nodes):
+    config = EasyConfig2()
+    section = config.root().addSubSection("section")
+    for i in range(nodes // 1000):
+        inner = section.addSubSection("inner_{}".format(i))
+        for j in range(1000):
+            inner.addString("key_{}".format(j), default="value")
+    return config
+
+
+def build_bulk(nodes):
+    config = EasyConfig2()
+    section = config.root().addSubSection("section")
+    for i in range(nodes // 1000):
+        inner = section.addSubSection("inner_{}".format(i))
+        inner.add_children([EasyInputBox("key_{}".format(j), default="value") for j in range(1000)])
+    return config
+
+
+def main():
+    nodes = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print("{} nodes".format(nodes))
+    for name, build in [("addString", build_one_by_one), ("add_children", build_bulk)]:
+        start = time.perf_counter()
+        build(nodes)
+        print("{:>14} {:>8.3f}s".format(name, time.perf_counter() - start))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Import time and memory of the headless core (load, query, save) compared
+with the same work after importing the Qt widgets. Each case runs in a
+fresh interpreter.
+
+    python benchmarks/bench_import.py
+"""
+import subprocess
+import sys
+import textwrap
+
+CASES = {
+    "headless": "",
+    "with Qt": "import easyconfig2.easywidgets",
+}
+
+CODE = textwrap.dedent("""
+    import resource, sys, tempfile, time, os
+    t0 = time.perf_counter()
+    from easyconfig2.easyconfig import EasyConfig2
+    {extra}
+    t1 = time.perf_counter()
+    config = EasyConfig2()
+    section = config.root().addSubSection("section")
+    for i in range(100):
+        section.addInt("key_{{}}".format(i), default=i)
+    filename = os.path.join(tempfile.mkdtemp(), "config.yaml")
+    config.save(filename)
+    config.load(filename)
+    assert config.get("section/key_10") == 10
+    t2 = time.perf_counter()
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print("{{:.1f}} {{:.1f}} {{:.1f}} {{}}".format((t1 - t0) * 1000, (t2 - t1) * 1000, rss, "PyQt5" in sys.modules))
+""")
+
+
+def main():
+    print("{:>10} {:>12} {:>12} {:>12} {:>8}".format("case", "import ms", "work ms", "max RSS MB", "PyQt5"))
+    for name, extra in CASES.items():
+        out = subprocess.run([sys.executable, "-c", CODE.format(extra=extra)],
+                             capture_output=True, text=True, check=True).stdout.split()
+        print("{:>10} {:>12} {:>12} {:>12} {:>8}".format(name, *out))
+
+
+if __name__ == "__main__":
+    main()
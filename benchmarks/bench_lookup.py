@@ -0,0 +1,35 @@
+"""Lookup cost of get_child / get_node / EasyConfig2.get as the sections
+get wider. With the key and path indexes the time per lookup should not
+depend on the width of the section.
+
+    python benchmarks/bench_lookup.py
+"""
+import timeit
+
+from easyconfig2.easyconfig import EasyConfig2
+
+
+def build(width):
+    config = EasyConfig2()
+    section = config.root().addSubSection("section")
+    inner = section.addSubSection("inner")
+    for i in range(width):
+        inner.addString("key_{}".format(i), default=str(i))
+    return config, inner
+
+
+def main():
+    number = 20000
+    print("{:>8} {:>14} {:>14} {:>14}".format("width", "get_child", "get_node", "config.get"))
+    for width in [10, 100, 1000, 10000]:
+        config, inner = build(width)
+        last = "key_{}".format(width - 1)
+        path = "section/inner/" + last
+        t_child = timeit.timeit(lambda: inner.get_child(last), number=number) / number
+        t_node = timeit.timeit(lambda: config.root().get_node(path), number=number) / number
+        t_get = timeit.timeit(lambda: config.get(path), number=number) / number
+        print("{:>8} {:>12.3f}us {:>12.3f}us {:>12.3f}us".format(width, t_child * 1e6, t_node * 1e6, t_get * 1e6))
+
+
+if __name__ == "__main__":
+    main()
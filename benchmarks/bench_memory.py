@@ -0,0 +1,59 @@
+"""Memory used by the nodes of large trees, measured with tracemalloc.
+Plain options, private options (never shown, so their signals are never
+connected) and options of a tree shown in a dialog (signals connected)
+are compared.
+
+    python benchmarks/bench_memory.py [nodes]
+"""
+import sys
+import tracemalloc
+
+from easyconfig2.easyconfig import EasyConfig2
+
+
+def build(nodes, private):
+    config = EasyConfig2()
+    section = config.root().addSubSection("section", hidden=private)
+    for i in range(nodes // 100):
+        inner = section.addSubSection("inner_{}".format(i))
+        for j in range(100):
+            key = "key_{}".format(j)
+            if private:
+                inner.addPrivate(key, default=j)
+            else:
+                inner.addString(key, default="value")
+    return config
+
+
+def connect(config):
+    def slot(node):
+        pass
+    for node in config.root().paths.values():
+        node.node_value_changed.connect(slot)
+        node.value_changed.connect(slot)
+    return slot
+
+
+def measure(nodes, private, connected=False):
+    tracemalloc.start()
+    config = build(nodes, private)
+    slot = connect(config) if connected else None
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, peak
+
+
+def main():
+    nodes = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    print("{} nodes".format(nodes))
+    print("{:>20} {:>12} {:>12} {:>10}".format("tree", "current", "peak", "per node"))
+    for name, private, connected in [("options", False, False),
+                                     ("private options", True, False),
+                                     ("connected options", False, True)]:
+        current, peak = measure(nodes, private, connected)
+        print("{:>20} {:>10.1f}MB {:>10.1f}MB {:>9.0f}B".format(name, current / 2 ** 20, peak / 2 ** 20,
+                                                                current / nodes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Time to dump and load the dictionary of the same node tree with each
+serializer backend.
+
+    python benchmarks/bench_serializers.py [nodes]
+"""
+import sys
+import time
+
+import yaml
+
+from easyconfig2.easyconfig import EasyConfig2
+from easyconfig2.easyserializer import EasyYamlSerializer, EasyJsonSerializer
+
+
+def build(nodes):
+    config = EasyConfig2()
+    for i in range(nodes // 100):
+        section = config.root().addSubSection("section_{}".format(i))
+        for j in range(50):
+            section.addString("string_{}".format(j), default="value {} {}".format(i, j))
+            section.addInt("int_{}".format(j), default=i * j)
+    return config
+
+
+def timed(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    nodes = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    data = build(nodes).get_dictionary()
+    backends = {"yaml (pure)": EasyYamlSerializer(yaml.SafeLoader, yaml.Dumper)}
+    if yaml.__with_libyaml__:
+        backends["yaml (libyaml)"] = EasyYamlSerializer(yaml.CSafeLoader, yaml.CDumper)
+    backends["json"] = EasyJsonSerializer()
+
+    print("{} nodes".format(nodes))
+    print("{:>16} {:>12} {:>12} {:>10}".format("backend", "dump ms", "load ms", "size KB"))
+    for name, serializer in backends.items():
+        t_dump, string = timed(lambda: serializer.dumps(data))
+        t_load, loaded = timed(lambda: serializer.loads(string))
+        assert loaded == data
+        print("{:>16} {:>12.1f} {:>12.1f} {:>10.1f}".format(name, t_dump * 1000, t_load * 1000, len(string) / 1024))
+
+
+if __name__ == "__main__":
+    main()
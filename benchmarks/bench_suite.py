@@ -0,0 +1,242 @@
+"""Time and peak (Python) memory of the main operations on synthetic
+configurations of 10^2 to 10^5 options, with subsections of varied depth,
+base64 options and dependencies. The configurations are generated from a
+fixed seed, so every run measures the same trees.
+
+    QT_QPA_PLATFORM=offscreen python benchmarks/bench_suite.py
+    python benchmarks/bench_suite.py --sizes 100 1000 --save-baseline
+    python benchmarks/bench_suite.py --check --threshold 1.5
+
+The baselines are stored in benchmarks/baselines.json. --check exits with
+status 1 if an operation takes more time or memory than its baseline
+multiplied by the threshold. The baselines depend on the machine: save them
+again before checking on a different one. The operations on the tree are
+skipped if PyQt5 cannot be imported, and the trees (a minute or more for
+10^5 options) are only built up to 10^4 options unless --all is given.
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from easyconfig2.easyconfig import EasyConfig2
+from easyconfig2.easydependency import EasyMandatoryDependency, EasyPairDependency
+
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+# Differences below these are noise whatever the threshold
+MIN_TIME = 0.005
+MIN_MEMORY = 256 * 1024
+
+
+def generate(nodes, seed=0):
+    """Configuration with the given number of nodes: each one is added to a
+    random subsection (up to 6 levels), one in ten being a new subsection"""
+    rng = random.Random(seed)
+    config = EasyConfig2()
+    sections = [(config.root(), 0)]
+    masters = []
+    for i in range(nodes):
+        father, depth = sections[rng.randrange(len(sections))]
+        key = "key_{}".format(i)
+        kind = rng.random()
+        if kind < 0.1 and depth < 6:
+            sections.append((father.addSubSection(key), depth + 1))
+        elif kind < 0.3:
+            father.addString(key, default="value {}".format(i))
+        elif kind < 0.45:
+            father.addInt(key, default=i)
+        elif kind < 0.55:
+            father.addFloat(key, default=i / 10)
+        elif kind < 0.65:
+            father.addCombobox(key, items=["a", "b", "c"], default=i % 3)
+        elif kind < 0.75:
+            # base64 options
+            father.addEditBox(key, default="text {}\n".format(i) * 4, base64=True)
+        elif kind < 0.8:
+            father.addPassword(key, default="secret {}".format(i))
+        else:
+            node = father.addCheckbox(key, default=i % 2 == 0)
+            masters.append(node)
+
+    # One dependency every 20 nodes, a quarter of them mandatory
+    leaves = [node for node in config.root().paths.values() if node.get_key().startswith("key_")]
+    for i in range(nodes // 20):
+        master = masters[rng.randrange(len(masters))] if masters else leaves[0]
+        if i % 4 == 0:
+            config.add_dependency(EasyMandatoryDependency(master, lambda value: value is True))
+        else:
+            config.add_dependency(EasyPairDependency(master, leaves[rng.randrange(len(leaves))],
+                                                     lambda value: value is True))
+    return config
+
+
+def get_application():
+    try:
+        from PyQt5.QtWidgets import QApplication
+    except ImportError:
+        return None
+    return QApplication.instance() or QApplication(sys.argv[:1])
+
+
+# Each operation prepares what it needs and returns the function measured
+
+def op_build(nodes):
+    return lambda: generate(nodes)
+
+
+def op_get_dictionary(nodes):
+    config = generate(nodes)
+    return config.get_dictionary
+
+
+def op_get_dictionary_one_change(nodes):
+    config = generate(nodes)
+    config.get_dictionary()
+    node = list(config.root().paths.values())[-1]
+
+    def run():
+        node.set(node.get())
+        config.get_dictionary()
+    return run
+
+
+def op_save(nodes):
+    config = generate(nodes)
+    filename = os.path.join(tempfile.mkdtemp(), "bench.yaml")
+
+    return lambda: config.save(filename)
+
+
+def op_load_from_string(nodes):
+    config = generate(nodes)
+    string = config.get_serializer().dumps(config.get_dictionary())
+    return lambda: config.load_from_string(string, only_changed=False)
+
+
+def op_tree(nodes):
+    from easyconfig2.easytree import EasyTree
+    config = generate(nodes)
+
+    def run():
+        tree = EasyTree(config.root(), config.dependencies)
+        tree.deleteLater()
+    return run
+
+
+def op_model_tree(nodes):
+    from easyconfig2.easymodeltree import EasyModelTree
+    config = generate(nodes)
+
+    def run():
+        tree = EasyModelTree(config.root(), config.dependencies)
+        tree.deleteLater()
+    return run
+
+
+def op_check_all_dependencies(nodes):
+    from easyconfig2.easytree import EasyTree
+    config = generate(nodes)
+    # Lazy: the dependencies are checked against the values of the nodes
+    tree = EasyTree(config.root(), config.dependencies, lazy=True)
+    return tree.check_all_dependencies
+
+
+# name, operation, needs Qt, largest size measured unless --all
+OPERATIONS = [("build", op_build, False, None),
+              ("get_dictionary", op_get_dictionary, False, None),
+              ("get_dictionary_one_change", op_get_dictionary_one_change, False, None),
+              ("save", op_save, False, None),
+              ("load_from_string", op_load_from_string, False, None),
+              ("tree", op_tree, True, 10000),
+              ("model_tree", op_model_tree, True, 10000),
+              ("check_all_dependencies", op_check_all_dependencies, True, None)]
+
+
+def measure(operation, nodes, repeat):
+    # Best time of repeat runs, each one prepared again
+    best = None
+    for _ in range(repeat):
+        run = operation(nodes)
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    # The memory is measured in a different run, tracemalloc slows it down
+    run = operation(nodes)
+    gc.collect()
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def load_baselines():
+    if not os.path.exists(BASELINES):
+        return {}
+    with open(BASELINES) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="easyconfig2 benchmark suite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--operations", nargs="+", default=[name for name, _, _, _ in OPERATIONS])
+    parser.add_argument("--all", action="store_true", help="build widget trees of any size")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true")
+    parser.add_argument("--threshold", type=float, default=1.5)
+    args = parser.parse_args()
+
+    app = get_application()
+    baselines = load_baselines()
+    regressions = []
+
+    print("{:>8} {:>26} {:>10} {:>10} {:>10}".format("nodes", "operation", "time", "peak", "baseline"))
+    for nodes in args.sizes:
+        # The largest trees take long, a single run is enough
+        repeat = args.repeat if nodes < 100000 else 1
+        for name, operation, needs_qt, max_nodes in OPERATIONS:
+            if name not in args.operations:
+                continue
+            if needs_qt and app is None:
+                continue
+            if max_nodes is not None and nodes > max_nodes and not args.all:
+                continue
+            elapsed, peak = measure(operation, nodes, repeat)
+            key = "{}/{}".format(nodes, name)
+            baseline = baselines.get(key)
+            print("{:>8} {:>26} {:>9.4f}s {:>8.1f}MB {:>10}".format(
+                nodes, name, elapsed, peak / 2 ** 20,
+                "-" if baseline is None else "{:.4f}s".format(baseline["time"])))
+
+            if args.check and baseline is not None:
+                if elapsed > max(baseline["time"] * args.threshold, baseline["time"] + MIN_TIME):
+                    regressions.append("{} time {:.4f}s > {:.4f}s".format(key, elapsed, baseline["time"]))
+                if peak > max(baseline["peak"] * args.threshold, baseline["peak"] + MIN_MEMORY):
+                    regressions.append("{} peak {} > {}".format(key, peak, baseline["peak"]))
+            if args.save_baseline:
+                baselines[key] = {"time": elapsed, "peak": peak}
+
+    if args.save_baseline:
+        with open(BASELINES, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+
+    if regressions:
+        print("Regressions (threshold {}):".format(args.threshold))
+        for regression in regressions:
+            print("  " + regression)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
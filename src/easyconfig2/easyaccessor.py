@@ -0,0 +1,69 @@
+from easyconfig2.easynodes import EasySubsection
+
+
+class EasyAccessor:
+    """Attributes of a subsection: its options and the accessors of its
+    subsections, as in config.ss1.ss3.ss3_string_1. Each subsection has its
+    own generated subclass holding them as class attributes, so the accessor
+    is a single slot object and adding a child only adds an attribute"""
+    __slots__ = ("_subsection",)
+
+    def __init__(self, subsection):
+        self._subsection = subsection
+
+    def __repr__(self):
+        return "<{} of {}>".format(type(self).__name__, self._subsection.get_path())
+
+
+class EasyValuesAccessor(EasyAccessor):
+    """As EasyAccessor but the attributes of the options are their values,
+    setting them sets the value of the option"""
+    __slots__ = ()
+
+
+def make_value_property(node):
+    def fget(self):
+        return node.get()
+
+    def fset(self, value):
+        node.set(value)
+
+    return property(fget, fset)
+
+
+def get_field(child, values):
+    if isinstance(child, EasySubsection):
+        return child.get_accessor(values)
+    if values:
+        return make_value_property(child)
+    return child
+
+
+def get_fields(children, values, namespace):
+    fields = {}
+    for child in children:
+        key = child.get_key()
+        # The first child with a given key wins, as in get_child
+        if not key.startswith("_") and key not in namespace and key not in fields:
+            fields[key] = get_field(child, values)
+    return fields
+
+
+def add_accessor_fields(accessor, children, values):
+    cls = type(accessor)
+    fields = get_fields(children, values, cls.__dict__)
+    if len(fields) == 1:
+        setattr(cls, *fields.popitem())
+    elif fields:
+        # Setting many class attributes one by one is slower than
+        # generating the class again (the instance stays the same)
+        namespace = {key: value for key, value in cls.__dict__.items() if not key.startswith("__")}
+        accessor.__class__ = type(cls.__name__, cls.__bases__, {**namespace, **fields, "__slots__": ()})
+
+
+def make_accessor(subsection, values=False):
+    """Generate the accessor class of a subsection and its instance. The
+    accessors of its subsections are created as well"""
+    base = EasyValuesAccessor if values else EasyAccessor
+    fields = get_fields(subsection.get_children(), values, {})
+    return type(base.__name__, (base,), {**fields, "__slots__": ()})(subsection)
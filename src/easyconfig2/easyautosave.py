@@ -0,0 +1,138 @@
+import atexit
+import threading
+import time
+import traceback
+
+from easyconfig2.easywatcher import is_qt_running, is_qt_thread, get_invoker
+
+
+class EasyAutosave:
+    """Saves a configuration from a worker thread some time after its values
+    change. Changes are debounced by delay seconds but the first pending
+    change is never delayed more than max_latency seconds.
+    The snapshot of the values is taken in the Qt thread if a Qt application
+    is running, otherwise by the worker: the nodes set meanwhile in other
+    threads wait for it (see EasyNode.get_lock)"""
+
+    def __init__(self, config, delay=1.0, max_latency=5.0):
+        self.config = config
+        self.delay = delay
+        self.max_latency = max_latency
+        self.first_change = None
+        self.deadline = None
+        self.running = True
+        self.connected = set()
+        # Snapshot requested to the Qt thread and not written yet, and the
+        # one taken, handed over to the worker (see request_snapshot)
+        self.requested = False
+        self.snapshot = None
+        self.invoker = None
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run, name="easyconfig-autosave", daemon=True)
+        self.thread.start()
+        atexit.register(self.stop)
+
+    def follow(self, node):
+        if node not in self.connected:
+            node.value_changed.connect(self.mark_dirty)
+            self.connected.add(node)
+
+    def unfollow_all(self):
+        for node in self.connected:
+            node.value_changed.disconnect(self.mark_dirty)
+        self.connected.clear()
+
+    def mark_dirty(self, *args):
+        now = time.monotonic()
+        with self.condition:
+            if self.first_change is None:
+                self.first_change = now
+            self.deadline = min(now + self.delay, self.first_change + self.max_latency)
+            self.condition.notify()
+
+    def is_dirty(self):
+        return self.first_change is not None or self.requested
+
+    def run(self):
+        with self.condition:
+            while self.running:
+                if self.snapshot is not None:
+                    snapshot, self.snapshot = self.snapshot, None
+                    self.requested = False
+                    # Values can change (and be marked) while writing
+                    self.condition.release()
+                    try:
+                        self.write(snapshot)
+                    finally:
+                        self.condition.acquire()
+                    continue
+                if self.deadline is None:
+                    self.condition.wait()
+                    continue
+                remaining = self.deadline - time.monotonic()
+                if remaining > 0:
+                    self.condition.wait(remaining)
+                    continue
+                self.first_change = self.deadline = None
+                if is_qt_running() and not is_qt_thread():
+                    self.request_snapshot()
+                    continue
+                self.condition.release()
+                try:
+                    self.save()
+                finally:
+                    self.condition.acquire()
+
+    def request_snapshot(self):
+        # Called holding the condition: take_snapshot() runs in the Qt thread
+        self.requested = True
+        if self.invoker is None:
+            self.invoker = get_invoker()
+        self.invoker.invoke.emit(self.take_snapshot)
+
+    def take_snapshot(self):
+        # NOTE: the dictionary of the values is not modified by later changes
+        # of the nodes (the changed subsections are rebuilt into new ones)
+        # so it can be serialized and written while the nodes change
+        with self.condition:
+            if not self.running or not self.requested:
+                # Stopped or flushed meanwhile
+                return
+        snapshot = self.config.take_snapshot()
+        with self.condition:
+            self.snapshot = snapshot
+            self.condition.notify()
+
+    def write(self, snapshot):
+        try:
+            self.config.save_snapshot(snapshot)
+        except Exception:
+            traceback.print_exc()
+
+    def save(self):
+        try:
+            self.config.save()
+        except Exception:
+            traceback.print_exc()
+
+    def flush(self):
+        """Save now, in the calling thread, if there are pending changes"""
+        with self.condition:
+            dirty = self.is_dirty()
+            self.first_change = self.deadline = None
+            # A requested snapshot not written yet is older than this save
+            self.requested = False
+            self.snapshot = None
+        if dirty:
+            self.save()
+
+    def stop(self):
+        with self.condition:
+            if not self.running:
+                return
+            self.running = False
+            self.condition.notify()
+        self.thread.join()
+        atexit.unregister(self.stop)
+        self.unfollow_all()
+        self.flush()
@@ -1,26 +1,45 @@
 import base64
+import contextlib
 import os
-import textwrap
+import threading
 
-import yaml
-from PyQt5.QtCore import QObject, pyqtSignal
+from easyconfig2.easyautosave import EasyAutosave
+from easyconfig2.easydependency import EasyMandatoryDependency
+from easyconfig2.easydocument import document_cache, get_writer
+from easyconfig2.easynodes import Root, EasySubsection, EasyPrivateNode, EasyNode, EasyTransaction
+from easyconfig2.easyserializer import get_serializer
+from easyconfig2.easyspec import build_spec, get_compiled_spec
+from easyconfig2 import easystats
+from easyconfig2.easystats import EasyStats, NOT_MEASURED
+from easyconfig2.easywatcher import EasyFileWatcher
+from easyconfig2.easysignal import EasySignal
 
-from easyconfig2.easydialog import EasyDialog
-from easyconfig2.easynodes import Root, EasySubsection, EasyPrivateNode, EasyNode
-from easyconfig2.easytree import EasyTree
 
-
-class EasyConfig2(QObject):
-    edited = pyqtSignal()
+class EasyConfig2:
+    # NOTE: Qt is imported only by edit() and get_widget(), loading,
+    # querying and saving a configuration do not need it
 
     def __init__(self, **kwargs):
-        super().__init__()
+        self.edited = EasySignal()
+        # Emitted after loading with the paths of the changed nodes
+        self.values_reloaded = EasySignal()
         self.section_name = kwargs.pop("name", None)
         self.globally_encoded = kwargs.pop("encoded", False)
         self.filename = kwargs.pop("filename", None)
+        # By default chosen according to the extension of the file
+        self.serializer = kwargs.pop("serializer", None)
+        # Seconds during which the saved sections of a shared file
+        # are collected before writing them all at once
+        self.coalesce = kwargs.pop("coalesce", None)
+        # Create the widgets of a subsection only when it is expanded
+        self.lazy = kwargs.pop("lazy", False)
+        # "widgets" (EasyTree) or "model" (EasyModelTree)
+        self.view = kwargs.pop("view", "widgets")
         self.easyconfig_private = {}
         self.tree = None
         self.dependencies = {}
+        # Keys of the children of the root set as attributes, see set_child_attribute
+        self.child_attributes = set()
         self.root_node = Root(self, **kwargs)
         self.private = self.root_node.add_child(EasySubsection("easyconfig", hidden=True))
         self.collapsed = self.private.add_child(EasyPrivateNode("collapsed", default=""))
@@ -28,14 +47,86 @@ class EasyConfig2(QObject):
         self.disabled = self.private.add_child(EasyPrivateNode("disabled", default=None, save_if_none=False))
         self.whole_file = None
         self.loaded_values = {}
+        # Held while taking a snapshot and writing it (see save)
+        self.save_lock = threading.RLock()
+        # Filename, dictionary and number of the snapshot of the last save,
+        # to skip saving it again and to never write an older snapshot
+        self.saved = None
+        self.snapshots = 0
+        self.counters = {"serialized_nodes": 0, "rebuilt_subsections": 0, "saves": 0, "skipped_saves": 0}
+        self.autosave = None
+        self.watcher = None
+        # Instrumentation, see enable_stats
+        self.stats = None
 
     def root(self):
         return self.root_node
 
+    def check_child_key(self, child):
+        # Neither the attributes of the configuration nor its private
+        # subsection (the first child of the root) can be overwritten
+        key = child.key
+        if (hasattr(self, key) and key not in self.child_attributes) or \
+                (hasattr(self, "private") and key == self.private.key):
+            raise ValueError("{} is reserved, it cannot be the key of a child of the root".format(child.key))
+
+    def set_child_attribute(self, child):
+        """The children of the root are attributes of the configuration, the
+        subsections through their accessors: config.ss1.ss3.ss3_string_1.
+        The first child with a given key wins"""
+        if child.key not in self.child_attributes:
+            self.child_attributes.add(child.key)
+            setattr(self, child.key, child.get_accessor() if isinstance(child, EasySubsection) else child)
+
     def add(self, node):
         self.root_node.add_child(node)
         return node
 
+    def add_spec(self, spec, cache_dir=None, subsection=None):
+        """Create the nodes described by a spec (a dictionary or a YAML/JSON
+        file, see easyspec.compile_spec) in the subsection, the root by
+        default. With cache_dir the compiled spec is cached on disk"""
+        return build_spec(get_compiled_spec(spec, cache_dir), subsection or self.root_node)
+
+    def get_node(self, path):
+        return self.root_node.get_node(path)
+
+    def get(self, path, default=None):
+        node = self.root_node.get_node(path)
+        if node is None:
+            return default
+        return node.get(default)
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Set many values without notifying each one: signals, widget updates,
+        dependency checks and callbacks happen once per changed node when the
+        block ends. If the block raises, the previous values are restored"""
+        root = self.root_node
+        if root.transaction is not None:
+            # Nested: part of the outer transaction
+            yield root.transaction
+            return
+
+        transaction = root.transaction = EasyTransaction()
+        try:
+            yield transaction
+        except BaseException:
+            root.transaction = None
+            transaction.rollback()
+            raise
+        root.transaction = None
+        transaction.commit()
+
+    def update(self, values):
+        """Set the values of a path -> value dictionary in a single batch"""
+        with self.batch():
+            for path, value in values.items():
+                node = self.root_node.get_node(path)
+                if node is None:
+                    raise ValueError("Node {} not found".format(path))
+                node.set(value)
+
     def transform_dict(self, d):
         new_dict = {}
         for key, value in d.items():
@@ -53,75 +144,120 @@ class EasyConfig2(QObject):
 
     def create_dictionary(self, node, values=None):
         # create a dictionary to store the values traversing the tree
-
-        if values is None:
-            values = {}
+        # NOTE: only the subsections containing changed nodes are rebuilt,
+        # the others are reused. The dictionaries are shared and rebuilt
+        # into new ones, so they must not be modified in place
+        if node.dirty or node.dictionary is None:
+            # Cleared before building: a value set meanwhile marks it again
+            node.dirty = False
+            node.dictionary = self.build_dictionary(node)
+            self.counters["rebuilt_subsections"] += 1
+
+        if values is not None:
+            values.update(node.dictionary)
+            return values
+        return node.dictionary
+
+    def build_dictionary(self, node):
+        values = {}
         # iterate over the children of the node
         for child in node.get_children():
+            if not child.is_savable():
+                continue
             # if the child is a subsection, traverse it
             if isinstance(child, EasySubsection):
-                if child.is_savable():
-                    new_dict = {}
-                    self.create_dictionary(child, new_dict)
-                    values[child.get_key()] = new_dict
+                values[child.get_key()] = self.create_dictionary(child)
             else:
-                # if the child is a TextLine, store the value in the dictionary
-                if child.is_savable():
-                    if child.get() is not None or child.is_savable_if_none():
-                        if child.is_base64() and child.get() is not None:
-                            # Encode in base64 if required
-                            # NOTE: we use yaml to dump the value to ensure that
-                            # the value is stored according to the type it has and
-                            # to take into account that might be a list or a dict
-                            encoded = base64.b64encode(yaml.dump(child.get()).encode()).decode()
-                            encoded = " ".join(textwrap.wrap(encoded, 80))
-                            values[child.get_key()] = encoded
-                        else:
-                            values[child.get_key()] = child.get()
+                if child.dirty:
+                    child.dirty = False
+                    self.counters["serialized_nodes"] += 1
+                # Encode in base64 if required: the encoded form is cached
+                # by the node and a value never read is not even decoded
+                value = child.get_encoded() if child.is_base64() else child.value
+                if value is not None or child.is_savable_if_none():
+                    values[child.get_key()] = value
+        return values
 
     def get_dictionary(self):
-        values = {}
-        self.create_dictionary(self.root_node, values)
-        return values
+        """Values of the whole tree. Cached: do not modify it"""
+        # No value changes while it is built, whatever thread sets them
+        with self.root_node.lock, self.measure("get_dictionary"):
+            return self.create_dictionary(self.root_node)
+
+    def get_serializer(self, filename=None):
+        return self.serializer or get_serializer(filename or self.filename)
 
-    def load(self, filename=None, emit=False):
+    def load(self, filename=None, emit=False, only_changed=True, batch=False):
         filename = filename or self.filename
         if not os.path.exists(filename):
-            return
+            return []
+
+        serializer = self.get_serializer(filename)
+        with self.measure("load"):
+            if self.section_name is None and self.globally_encoded:
+                # The whole file is a base64 string, nothing to share
+                with open(filename, "r") as f:
+                    return self.load_from_string(f.read(), emit, serializer, only_changed, batch)
+            else:
+                with self.measure("parse"):
+                    data = document_cache.load(filename, serializer)
+                return self.load_from_document(data, emit, serializer, only_changed, batch)
+
+    def reload(self, filename=None, batch=False):
+        """Load the file setting only the nodes whose value has changed"""
+        return self.load(filename, only_changed=True, batch=batch)
 
-        with open(filename, "r") as f:
-            string = f.read()
-            self.load_from_string(string, emit)
+    def watch(self, interval=1.0, batch=False):
+        """Reload the file when its content changes"""
+        if self.filename is None:
+            raise ValueError("Filename not provided")
+        self.unwatch()
+        self.watcher = EasyFileWatcher(self.filename, lambda: self.reload(batch=batch), interval)
+
+    def unwatch(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+
+    def load_from_string(self, string, emit=False, serializer=None, only_changed=True, batch=False):
+        serializer = serializer or self.get_serializer()
+        with self.measure("parse"):
+            if self.section_name is None and self.globally_encoded:
+                string = base64.b64decode(string).decode()
+            data = serializer.loads(string)
+        return self.load_from_document(data, emit, serializer, only_changed, batch)
 
-    def load_from_string(self, string, emit=False):
-        if self.section_name is None and not self.globally_encoded:
-            self.loaded_values = yaml.safe_load(string)
+    def load_from_document(self, data, emit=False, serializer=None, only_changed=True, batch=False):
+        serializer = serializer or self.get_serializer()
+        # The values not belonging to the nodes may differ, save again
+        self.saved = None
 
-        elif self.section_name is None and self.globally_encoded:
-            string = base64.b64decode(string).decode()
-            self.loaded_values = yaml.safe_load(string)
+        if self.section_name is None:
+            self.loaded_values = data
 
         elif not self.globally_encoded:
 
             # The section name is NOT None
             # and globally encoded is False
-            data = yaml.safe_load(string)
             self.loaded_values = data.get(self.section_name, {})
         else:
 
             # Section name is NOT None and globally encoded is True
-            data = yaml.safe_load(string)
             string = data.get(self.section_name, None)
             if string is not None:
-                string = base64.b64decode(string).decode()
-                self.loaded_values = yaml.safe_load(string)
+                with self.measure("parse"):
+                    string = base64.b64decode(string).decode()
+                    self.loaded_values = serializer.loads(string)
             else:
                 self.loaded_values = {}
 
-        self.parse_dictionary_into_node(self.loaded_values, self.root_node, emit)
+        with self.measure("load_values"):
+            changed = self.parse_dictionary_into_node(self.loaded_values, self.root_node, emit, only_changed,
+                                                      batch)
 
-        for key in self.hidden.get([]):
+        for key in self.hidden.value or []:
             self.root_node.get_node(key).set_hidden(True)
+        return changed
 
     def parse(self, dictionary):
         self.parse_dictionary_into_node(dictionary, self.root_node)
@@ -138,41 +274,142 @@ class EasyConfig2(QObject):
         if dictionary is not None:
             self.parse_dictionary_into_node(dictionary, node)
 
-    def save(self, filename=None):
+    def save(self, filename=None, force=False):
+        """Save the values, unless none has changed since the last save to
+        the same file (see the README for the changes detected). Returns
+        whether the file was written"""
         filename = filename or self.filename
         if filename is None:
             raise ValueError("Filename not provided")
-        values = self.get_dictionary()
+        with self.save_lock:
+            return self.save_snapshot(self.take_snapshot(), filename, force)
+
+    def take_snapshot(self):
+        """Values to be written by save_snapshot(), as they are now: the
+        nodes set meanwhile in other threads wait until it is taken"""
+        with self.save_lock:
+            self.snapshots += 1
+            return self.snapshots, self.get_dictionary()
+
+    def save_snapshot(self, snapshot, filename=None, force=False):
+        # Called by save() and by the autosave thread
+        filename = filename or self.filename
+        number, values = snapshot
+        with self.save_lock:
+            saved = self.saved
+            if saved is not None and saved[0] == filename:
+                # The dictionary is the same object until a value changes
+                if number < saved[2] or (not force and saved[1] is values and os.path.exists(filename)):
+                    self.counters["skipped_saves"] += 1
+                    return False
+            self.save_values(values, filename)
+            self.saved = (filename, values, number)
+            return True
+
+    def save_values(self, values, filename):
+        serializer = self.get_serializer(filename)
+        with self.save_lock, self.measure("save"):
+            self._save_values(values, filename, serializer)
+            self.counters["saves"] += 1
 
+    def _save_values(self, values, filename, serializer):
         if self.section_name is None:
             # Apply the new values to the loaded values
             # and save them to the *exclusive* file (section_name is None)
-            self.loaded_values.update(values)
-            if not self.globally_encoded:
-                string = yaml.dump(self.loaded_values)
-            else:
-                string = base64.b64encode(yaml.dump(self.loaded_values).encode()).decode()
+            # NOTE: not updated in place, the document may be shared
+            self.loaded_values = {**self.loaded_values, **values}
+            with self.measure("serialize"):
+                if not self.globally_encoded:
+                    string = serializer.dumps(self.loaded_values)
+                else:
+                    string = base64.b64encode(serializer.dumps(self.loaded_values).encode()).decode()
 
             with open(filename, "w") as f:
                 f.write(string)
-        else:
-            # Section name is NOT None
-            data = {}
-            if os.path.exists(filename):
-                # We reload the file to get updated values
-                with open(filename, "r") as f:
-                    data = yaml.safe_load(f)
 
             if not self.globally_encoded:
-                data[self.section_name] = values
+                document_cache.store(filename, serializer, self.loaded_values)
             else:
-                data[self.section_name] = base64.b64encode(yaml.dump(values).encode()).decode()
-
-            with open(filename, "w") as f:
-                yaml.dump(data, f)
+                document_cache.mark_written(filename)
+        else:
+            # Section name is NOT None: the section is handed to the writer
+            # of the file that merges it with those of other instances
+            if not self.globally_encoded:
+                section = values
+            else:
+                with self.measure("serialize"):
+                    section = base64.b64encode(serializer.dumps(values).encode()).decode()
 
-    def edit(self, min_width=None, min_height=None, parent=None):
-        dialog = EasyDialog(EasyTree(self.root_node, self.dependencies), parent=parent)
+            writer = get_writer(filename)
+            writer.set_section(self.section_name, section, serializer)
+            if self.coalesce is None:
+                writer.flush()
+            else:
+                writer.schedule(self.coalesce)
+
+    def enable_stats(self, hook=None):
+        """Record the duration and number of calls of the operations (see
+        EasyStats). hook(name), if given, must return a context manager
+        wrapping each measured operation, for external profilers"""
+        self.disable_stats()
+        self.stats = self.root_node.stats = EasyStats(hook)
+        easystats.active += 1
+        return self.stats
+
+    def disable_stats(self):
+        if self.stats is not None:
+            self.stats = self.root_node.stats = None
+            easystats.active -= 1
+
+    def get_stats(self):
+        """Statistics recorded since enable_stats(), empty if disabled"""
+        return {} if self.stats is None else self.stats.get_stats()
+
+    def measure(self, name):
+        # Context manager timing an operation if the statistics are enabled
+        if self.stats is None:
+            return NOT_MEASURED
+        return self.stats.measure(name)
+
+    def enable_autosave(self, delay=1.0, max_latency=5.0):
+        """Save the configuration in a worker thread when its values change,
+        delay seconds after the last change but no later than max_latency
+        seconds after the first one. Pending changes are saved at exit"""
+        if self.filename is None:
+            raise ValueError("Filename not provided")
+        self.disable_autosave()
+        self.autosave = EasyAutosave(self, delay, max_latency)
+        for node in self.root_node.paths.values():
+            self.autosave.follow(node)
+        self.root_node.node_added.connect(self.autosave.follow)
+
+    def disable_autosave(self):
+        # Pending changes are saved before stopping
+        if self.autosave is not None:
+            self.root_node.node_added.disconnect(self.autosave.follow)
+            self.autosave.stop()
+            self.autosave = None
+
+    def flush(self, filename=None):
+        """Write the sections of the file whose writing has been delayed"""
+        filename = filename or self.filename
+        if filename is None:
+            raise ValueError("Filename not provided")
+        get_writer(filename).flush()
+
+    def create_tree(self, root_node, view=None):
+        view = view or self.view
+        if view == "model":
+            from easyconfig2.easymodeltree import EasyModelTree
+            return EasyModelTree(root_node, self.dependencies)
+        elif view == "widgets":
+            from easyconfig2.easytree import EasyTree
+            return EasyTree(root_node, self.dependencies, self.lazy)
+        raise ValueError("Invalid view")
+
+    def edit(self, min_width=None, min_height=None, parent=None, view=None):
+        from easyconfig2.easydialog import EasyDialog
+        dialog = EasyDialog(self.create_tree(self.root_node, view), parent=parent)
         if min_width is not None:
             dialog.setMinimumWidth(min_width)
         if min_height is not None:
@@ -186,10 +423,10 @@ class EasyConfig2(QObject):
             return True
         return False
 
-    def get_widget(self, root_node=None, min_width=None, min_height=None, parent=None):
+    def get_widget(self, root_node=None, min_width=None, min_height=None, parent=None, view=None):
         if root_node is None:
             root_node = self.root_node
-        et = EasyTree(root_node, self.dependencies)
+        et = self.create_tree(root_node, view)
 
         if min_width is not None:
             et.setMinimumWidth(min_width)
@@ -198,7 +435,14 @@ class EasyConfig2(QObject):
 
         return et
 
-    def parse_dictionary_into_node(self, dictionary, root_node, emit=False):
+    def parse_dictionary_into_node(self, dictionary, root_node, emit=False, only_changed=True, batch=False):
+        """Set the values of the dictionary into the nodes. With only_changed
+        the nodes whose value is already the same are not set (no signals nor
+        callbacks). With batch the nodes do not emit value_changed nor call
+        their callbacks: values_reloaded is emitted once with the paths of
+        all the changed nodes instead. Returns the nodes that have been set.
+        NOTE: emit is kept for compatibility and has no effect"""
+        changed = []
 
         def parse_recursive(node, values):
             for child in node.get_children():
@@ -206,20 +450,51 @@ class EasyConfig2(QObject):
                     inner_dict = values.get(child.get_key(), {})
                     parse_recursive(child, inner_dict)
                 else:
-                    value = values.get(child.get_key(), child.value)
-                    # Decode base64 if needed
+                    key = child.get_key()
+                    if key not in values:
+                        if not only_changed:
+                            changed.append(child)
+                            self.apply_value(child, child.value, batch)
+                        continue
+
+                    value = values[key]
                     if child.is_base64() and value is not None:
-                        value = value.replace(" ", "")
-                        value = yaml.safe_load(base64.b64decode(value))
-
-                    # TODO: Decision made here
-                    # In this way the widgets, if visible, are not updated
-                    if not emit and False:
-                        child.value = value
+                        # Compared and stored encoded, decoded when read
+                        if only_changed and value == child.encoded:
+                            continue
+                        changed.append(child)
+                        self.apply_value(child, value, batch, encoded=True)
                     else:
-                        child.set(value)
+                        if only_changed and value == child.value:
+                            continue
+                        changed.append(child)
+                        self.apply_value(child, value, batch)
 
         parse_recursive(root_node, dictionary)
+        if changed:
+            self.values_reloaded.emit([child.get_path() for child in changed])
+        return changed
+
+    def apply_value(self, node, value, batch, encoded=False):
+        # value is the base64 form if encoded, decoded when first read
+        transaction = node.get_transaction()
+        if transaction is not None:
+            # Notified at commit, restored on rollback
+            transaction.record(node)
+        if encoded:
+            node.set_encoded(value)
+        else:
+            node.value = value
+        if transaction is None:
+            self.notify_value(node, batch)
+
+    @staticmethod
+    def notify_value(node, batch):
+        if batch:
+            # Only the widgets, if visible, are updated
+            node.notify_widget()
+        else:
+            node.notify()
 
     def add_dependencies(self, dependencies):
         for dep in dependencies:
@@ -229,3 +504,12 @@ class EasyConfig2(QObject):
         if self.dependencies.get(dep.master, None) is None:
             self.dependencies[dep.master] = []
         self.dependencies[dep.master].append(dep)
+
+    def check_dependencies(self):
+        """Check the mandatory dependencies against the values of the nodes,
+        the same the dialog does to enable the OK button but without Qt"""
+        for deps in self.dependencies.values():
+            for dep in deps:
+                if isinstance(dep, EasyMandatoryDependency) and not dep.call(dep.master.value):
+                    return False
+        return True
@@ -1,3 +1,7 @@
+from easyconfig2 import easystats
+from easyconfig2.easystats import get_stats, get_function_name
+
+
 class EasyDependency:
     def __init__(self, master, func, **kwargs):
         self.master = master
@@ -6,6 +10,11 @@ class EasyDependency:
     def call(self, value):
         if value == "" or value is None:
             return False
+        if easystats.active:
+            stats = get_stats(self.master)
+            if stats is not None:
+                with stats.measure("dependency/" + get_function_name(self.func)):
+                    return self.func(value)
         return self.func(value)
 
 
@@ -21,3 +30,26 @@ class EasyPairDependency(EasyDependency):
 
     def get_slave(self):
         return self.slave
+
+
+class EasyDependencyState:
+    """Keeps the failing mandatory dependencies so the global state can be
+    updated one dependency at a time instead of evaluating all of them"""
+
+    def __init__(self):
+        self.failing = set()
+
+    def update(self, dep, ok):
+        if ok:
+            self.failing.discard(dep)
+        else:
+            self.failing.add(dep)
+
+    def clear(self):
+        self.failing.clear()
+
+    def get_failing_count(self):
+        return len(self.failing)
+
+    def is_ok(self):
+        return len(self.failing) == 0
@@ -1,7 +1,12 @@
+from PyQt5.QtCore import QTimer
 from PyQt5.QtWidgets import QDialog, QVBoxLayout, QDialogButtonBox, QLineEdit, QLabel
 
 from easyconfig2.easyutils import get_validator_type
 
+# Milliseconds without typing before the tree is filtered: showing many rows
+# again takes longer than a keystroke, typing a word filters it once
+FILTER_DELAY = 150
+
 
 class EasyDialog(QDialog):
     def __init__(self, tree, parent=None):
@@ -10,6 +15,19 @@ class EasyDialog(QDialog):
         self.tree.config_ok.connect(self.config_ok)
         self.v_layout = QVBoxLayout()
         self.setLayout(self.v_layout)
+
+        # Shows only the options matching the text typed
+        self.filter_box = QLineEdit()
+        self.filter_box.setPlaceholderText("Filter")
+        self.filter_box.setClearButtonEnabled(True)
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(FILTER_DELAY)
+        self.filter_timer.timeout.connect(self.apply_filter)
+        self.filter_box.textChanged.connect(lambda: self.filter_timer.start())
+        # Indexed once the dialog is shown, before the user types
+        QTimer.singleShot(0, self.tree.get_search_index)
+        self.v_layout.addWidget(self.filter_box)
         self.v_layout.addWidget(tree)
 
         # add standard dialog buttonbox
@@ -20,6 +38,17 @@ class EasyDialog(QDialog):
 
         self.tree.check_all_dependencies()
 
+    def apply_filter(self):
+        self.tree.filter(self.filter_box.text())
+
+    def accept(self):
+        # The last edit may still be waiting to be propagated (e.g. debounced):
+        # checked against the values the user sees before closing
+        self.tree.flush_widgets()
+        self.tree.check_all_dependencies()
+        if self.tree.last_ok:
+            super().accept()
+
     def config_ok(self, state):
         self.buttonBox.button(QDialogButtonBox.Ok).setEnabled(state)
 
@@ -0,0 +1,137 @@
+import atexit
+import os
+import threading
+
+
+class EasyDocumentCache:
+    """Parsed documents shared by all the EasyConfig2 of the process, so the
+    sections of one file are parsed once. An entry is valid while the file
+    keeps the same modification time and size.
+    NOTE: the documents are shared, they must not be modified in place"""
+
+    def __init__(self):
+        self.documents = {}
+        # Path -> signature of the file when this process last wrote it,
+        # so watchers do not take the saves for external changes
+        self.written = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def get_signature(path):
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self, filename, serializer):
+        path = os.path.abspath(filename)
+        signature = self.get_signature(path)
+        with self.lock:
+            entry = self.documents.get(path)
+            if entry is not None and entry[0] == signature and entry[1] is serializer:
+                return entry[2]
+
+        with open(path, "r") as f:
+            data = serializer.loads(f.read())
+
+        with self.lock:
+            self.documents[path] = (signature, serializer, data)
+        return data
+
+    def store(self, filename, serializer, data):
+        # The document has just been written: no need to parse it again
+        path = os.path.abspath(filename)
+        signature = self.get_signature(path)
+        with self.lock:
+            self.documents[path] = (signature, serializer, data)
+            self.written[path] = signature
+
+    def mark_written(self, filename):
+        # Written by this process but not cached (see store)
+        path = os.path.abspath(filename)
+        signature = self.get_signature(path)
+        with self.lock:
+            self.documents.pop(path, None)
+            self.written[path] = signature
+
+    def is_written(self, filename, signature):
+        """Whether the file, with this signature, was written by this process"""
+        with self.lock:
+            return self.written.get(os.path.abspath(filename)) == signature
+
+    def invalidate(self, filename=None):
+        with self.lock:
+            if filename is None:
+                self.documents.clear()
+            else:
+                self.documents.pop(os.path.abspath(filename), None)
+
+
+document_cache = EasyDocumentCache()
+
+
+class EasyDocumentWriter:
+    """Collects the sections of one file that have to be saved and writes
+    them with a single read-merge-write. All the EasyConfig2 of the process
+    saving sections of the same file share the same writer"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.sections = {}
+        self.serializer = None
+        self.timer = None
+        self.lock = threading.RLock()
+
+    def set_section(self, name, values, serializer):
+        with self.lock:
+            self.sections[name] = values
+            self.serializer = serializer
+
+    def is_dirty(self):
+        return len(self.sections) > 0
+
+    def schedule(self, delay):
+        # Sections set before the timer expires are written together
+        with self.lock:
+            if self.timer is None:
+                self.timer = threading.Timer(delay, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def flush(self):
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            if not self.sections:
+                return
+
+            data = {}
+            if os.path.exists(self.filename):
+                # Copied as the cached document is shared
+                data = dict(document_cache.load(self.filename, self.serializer))
+            data.update(self.sections)
+            self.sections = {}
+
+            with open(self.filename, "w") as f:
+                f.write(self.serializer.dumps(data))
+            document_cache.store(self.filename, self.serializer, data)
+
+
+writers = {}
+writers_lock = threading.Lock()
+
+
+def get_writer(filename):
+    path = os.path.abspath(filename)
+    with writers_lock:
+        writer = writers.get(path)
+        if writer is None:
+            writer = writers[path] = EasyDocumentWriter(path)
+        return writer
+
+
+@atexit.register
+def flush_all():
+    with writers_lock:
+        pending = list(writers.values())
+    for writer in pending:
+        writer.flush()
@@ -0,0 +1,467 @@
+from PyQt5.QtCore import QAbstractItemModel, QModelIndex, Qt, pyqtSignal, QSize
+from PyQt5.QtWidgets import QTreeView, QStyledItemDelegate, QAbstractItemView, QStyleOptionProgressBar, QStyle, \
+    QApplication, QWidget
+
+from easyconfig2.easydependency import EasyPairDependency, EasyMandatoryDependency, EasyDependencyState
+from easyconfig2.easynodes import EasySubsection, EasyCheckBox, EasyComboBox, EasySlider, EasyPasswordEdit, \
+    EasyList, EasyFileList, EasyEditBox, EasyLabel
+from easyconfig2.easystats import get_stats, get_widget, NOT_MEASURED
+from easyconfig2.easytreemixin import EasyTreeMixin, is_own_thread
+
+# Elements of a list painted in its row
+MAX_PAINTED_ITEMS = 20
+
+
+def get_display_text(node, value):
+    """Text painted in the value column when the row is not being edited"""
+    if value is None:
+        return ""
+    if isinstance(node, EasyPasswordEdit):
+        return "●" * len(str(value))
+    if isinstance(node, EasyComboBox):
+        item = node.get_item(value) if isinstance(value, int) else None
+        return str(item) if item is not None else ""
+    if isinstance(node, EasySlider):
+        return format(value, node.kwargs.get("format", ".0f")) + node.kwargs.get("suffix", "")
+    if isinstance(node, (EasyList, EasyFileList)):
+        # Only the beginning of long lists fits in the row anyway
+        text = ", ".join(str(v) for v in value[:MAX_PAINTED_ITEMS])
+        return text + (", … ({} items)".format(len(value)) if len(value) > MAX_PAINTED_ITEMS else "")
+    if isinstance(node, EasyEditBox):
+        lines = str(value).splitlines()
+        return lines[0] + (" …" if len(lines) > 1 else "") if lines else ""
+    return str(value)
+
+
+class EasyTreeModel(QAbstractItemModel):
+    """Model over the EasySubsection/EasyNode hierarchy. The values edited
+    in the view are kept apart (as the widgets do in EasyTree) and applied
+    to the nodes by collect_values() unless the node uses immediate update"""
+
+    node_changed = pyqtSignal(object)
+    # Nodes set in another thread, see node_notified
+    node_queued = pyqtSignal(object)
+
+    def __init__(self, node, parent=None):
+        super().__init__(parent)
+        self.node = node
+        self.values = {}
+        self.disabled = set()
+        self.failing = set()
+        self.children = {}
+        self.rows = {}
+        # Children of each subsection while filtering, see show_only
+        self.shown_children = None
+        self.connected = set()
+        self.node_queued.connect(self.node_value_changed, Qt.QueuedConnection)
+        # The nodes outlive the model: stop notifying it once destroyed
+        self.destroyed.connect(lambda: self.disconnect_nodes())
+
+    def reset(self):
+        self.beginResetModel()
+        self.children.clear()
+        self.rows.clear()
+        self.endResetModel()
+
+    def show_only(self, children):
+        """Build the rows again with only the given children of each
+        subsection (a dictionary), or all of them if None"""
+        self.shown_children = children
+        self.reset()
+
+    def get_children(self, node):
+        # Visible children are computed (and connected) only when Qt asks for them
+        children = self.children.get(node)
+        if children is None:
+            if self.shown_children is not None:
+                children = self.shown_children.get(node, [])
+            else:
+                children = [child for child in node.get_children() if not child.is_hidden()]
+            self.children[node] = children
+            for row, child in enumerate(children):
+                self.rows[child] = row
+                self.connect_node(child)
+        return children
+
+    def connect_node(self, node):
+        if node not in self.connected:
+            node.node_value_changed.connect(self.node_notified)
+            self.connected.add(node)
+
+    def disconnect_nodes(self):
+        for node in self.connected:
+            node.node_value_changed.disconnect(self.node_notified)
+        self.connected.clear()
+
+    def get_node(self, index):
+        return index.internalPointer() if index.isValid() else self.node
+
+    def index_of(self, node, column=0):
+        if node is self.node or node.father is None:
+            return QModelIndex()
+        if node not in self.rows:
+            self.get_children(node.father)
+        row = self.rows.get(node)
+        if row is None:
+            return QModelIndex()
+        return self.createIndex(row, column, node)
+
+    def get_value(self, node):
+        if node in self.values:
+            return self.values[node]
+        # Not get(): only read, the node is not to be saved again
+        return node.value
+
+    def collect_values(self):
+        for node, value in self.values.items():
+            node.update_value(value)
+        self.values.clear()
+
+    def is_enabled(self, node):
+        while node is not None:
+            if node in self.disabled:
+                return False
+            node = node.father
+        return True
+
+    def set_enabled(self, node, enabled):
+        if enabled == (node not in self.disabled):
+            return
+        if enabled:
+            self.disabled.discard(node)
+        else:
+            self.disabled.add(node)
+        self.emit_changed(node)
+
+    def set_failing(self, node, failing):
+        if failing == (node in self.failing):
+            return
+        if failing:
+            self.failing.add(node)
+        else:
+            self.failing.discard(node)
+        self.emit_changed(node)
+
+    def emit_changed(self, node):
+        index = self.index_of(node)
+        if index.isValid():
+            self.dataChanged.emit(index, index.sibling(index.row(), 1))
+        # Disabling a subsection changes the flags of all the visible children
+        if node in self.children and len(self.children[node]) > 0:
+            parent = self.index_of(node)
+            last = len(self.children[node]) - 1
+            self.dataChanged.emit(self.index(0, 0, parent), self.index(last, 1, parent))
+            for child in self.children[node]:
+                if isinstance(child, EasySubsection):
+                    self.emit_changed(child)
+
+    def node_notified(self, node):
+        if is_own_thread(self):
+            self.node_value_changed(node)
+        else:
+            self.node_queued.emit(node)
+
+    def node_value_changed(self, node):
+        # The node has been set programmatically: overrides the edited value
+        self.values.pop(node, None)
+        index = self.index_of(node, 1)
+        if index.isValid():
+            self.dataChanged.emit(index, index)
+        self.node_changed.emit(node)
+
+    def index(self, row, column, parent=QModelIndex()):
+        # Called for every row shown each time the view lays them out
+        node = parent.internalPointer() if parent.isValid() else self.node
+        children = self.children.get(node)
+        if children is None:
+            children = self.get_children(node)
+        if 0 <= row < len(children) and 0 <= column < 2:
+            return self.createIndex(row, column, children[row])
+        return QModelIndex()
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        return self.index_of(index.internalPointer().father)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        node = self.get_node(parent)
+        if not isinstance(node, EasySubsection):
+            return 0
+        return len(self.get_children(node))
+
+    def columnCount(self, parent=QModelIndex()):
+        return 2
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        node = index.internalPointer()
+        if self.disabled and not self.is_enabled(node):
+            return Qt.NoItemFlags
+        if isinstance(node, EasySubsection):
+            return Qt.ItemIsEnabled
+        # Laying out the rows, the view does not ask for the children of the options
+        flags = Qt.ItemIsEnabled | Qt.ItemNeverHasChildren
+        if index.column() == 1 and not isinstance(node, EasyLabel) \
+                and node.editable and not node.kwargs.get("readonly", False):
+            if isinstance(node, EasyCheckBox):
+                flags |= Qt.ItemIsUserCheckable
+            else:
+                flags |= Qt.ItemIsEditable
+        return flags
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        if index.column() == 0:
+            if role == Qt.DisplayRole:
+                return node.get_pretty()
+            if role == Qt.ForegroundRole and node in self.failing:
+                return Qt.red
+            return None
+
+        if isinstance(node, EasySubsection):
+            return None
+        value = self.get_value(node)
+        if isinstance(node, EasyCheckBox):
+            if role == Qt.CheckStateRole:
+                return Qt.Checked if value else Qt.Unchecked
+            return None
+        if role == Qt.DisplayRole:
+            return get_display_text(node, value)
+        if role == Qt.EditRole:
+            return value
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or index.column() != 1:
+            return False
+        node = index.internalPointer()
+        if role == Qt.CheckStateRole:
+            value = value == Qt.Checked
+        elif role != Qt.EditRole:
+            return False
+
+        self.values[node] = value
+        if node.use_inmediate_update():
+            node.update_value(value)
+        self.dataChanged.emit(index, index)
+        self.node_changed.emit(node)
+        return True
+
+
+class EasyItemDelegate(QStyledItemDelegate):
+    """Paints the values as text (or a progress bar for sliders) and creates
+    the node's widget as editor only for the row being edited"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # The editors open, see EasyModelTree.flush_widgets
+        self.editors = set()
+
+    def createEditor(self, parent, option, index):
+        node = index.internalPointer()
+        editor = get_widget(node)
+        if editor is None:
+            return None
+        editor.setParent(parent)
+        editor.setAutoFillBackground(True)
+        if isinstance(getattr(editor, "widget", None), QWidget):
+            editor.setFocusProxy(editor.widget)
+        editor.widget_value_changed.connect(self.editor_value_changed)
+        self.editors.add(editor)
+        return editor
+
+    def destroyEditor(self, editor, index):
+        self.editors.discard(editor)
+        super().destroyEditor(editor, index)
+
+    def editor_value_changed(self, editor):
+        self.commitData.emit(editor)
+
+    def setEditorData(self, editor, index):
+        editor.set_value(index.model().get_value(index.internalPointer()))
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.get_value(), Qt.EditRole)
+
+    def updateEditorGeometry(self, editor, option, index):
+        editor.setGeometry(option.rect)
+
+    def sizeHint(self, option, index):
+        size = super().sizeHint(option, index)
+        node = index.internalPointer()
+        if isinstance(node, EasyEditBox):
+            return QSize(size.width(), node.kwargs.get("max_height", 100))
+        if isinstance(node, (EasyList, EasyFileList)):
+            return QSize(size.width(), node.kwargs.get("height", 50))
+        return QSize(size.width(), max(size.height(), 28))
+
+    def paint(self, painter, option, index):
+        node = index.internalPointer()
+        if index.column() == 1 and isinstance(node, EasySlider):
+            den = node.kwargs.get("den", 1)
+            value = index.model().get_value(node)
+            bar = QStyleOptionProgressBar()
+            bar.rect = option.rect.adjusted(3, 3, -3, -3)
+            bar.state = option.state
+            bar.minimum = node.kwargs.get("min", 0)
+            bar.maximum = node.kwargs.get("max", 100)
+            bar.progress = int(den * (value if value is not None else 0))
+            bar.text = index.data(Qt.DisplayRole)
+            bar.textVisible = node.kwargs.get("show_value", False)
+            style = option.widget.style() if option.widget is not None else QApplication.style()
+            style.drawControl(QStyle.CE_ProgressBar, bar, painter)
+            return
+        super().paint(painter, option, index)
+
+
+class EasyModelTree(EasyTreeMixin, QTreeView):
+    """Alternative to EasyTree that does not create one widget per row.
+    It offers the same interface to EasyDialog and EasyConfig2"""
+
+    config_ok = pyqtSignal(bool)
+
+    def __init__(self, node, dependencies):
+        super().__init__()
+        self.node = node
+        self.dependencies = dependencies
+        self.tree_model = EasyTreeModel(node, self)
+        self.dependency_state = EasyDependencyState()
+        self.last_ok = True
+        self.init_search()
+        self.setModel(self.tree_model)
+        self.delegate = EasyItemDelegate(self)
+        self.setItemDelegate(self.delegate)
+        self.header().setVisible(False)
+        self.setSelectionMode(QAbstractItemView.NoSelection)
+        self.setEditTriggers(QAbstractItemView.AllEditTriggers)
+        self.tree_model.node_changed.connect(self.node_changed)
+
+        stats = get_stats(node)
+        with NOT_MEASURED if stats is None else stats.measure("tree/populate"):
+            # The masters of the dependencies must be followed
+            # even if their rows have never been shown
+            for master in self.dependencies.keys():
+                self.tree_model.connect_node(master)
+
+            for row in range(self.tree_model.rowCount()):
+                self.expand(self.tree_model.index(row, 0))
+            self.resizeColumnToContents(0)
+        self.connect_expansion()
+        self.check_all_dependencies()
+
+    def update(self):
+        state = self.get_collapsed_items()
+        self.tree_model.shown_children = None
+        self.tree_model.reset()
+        self.set_collapsed_items(state)
+        # The rows are new and the nodes may have changed
+        self.search_index = None
+        if self.search_state is not None:
+            self._apply_filter(self.search_text)
+        self.check_all_dependencies()
+
+    def _apply_filter(self, text):
+        hide, show, expand = self.get_search_index().filter(text)
+        if len(hide) + len(show) > len(self.search_index.shown) or show and self.tree_model.shown_children is not None:
+            # Hiding rows one by one would take longer than building
+            # again only the rows to be shown (or they are not there)
+            self.tree_model.show_only(self.search_index.get_shown_children())
+            hide, show = (), ()
+        for node in expand:
+            index = self.tree_model.index_of(node)
+            if index.isValid() and not self.isExpanded(index):
+                self.expand(index)
+        for node in show:
+            self._set_node_hidden(node, False)
+        for node in hide:
+            self._set_node_hidden(node, True)
+        # Sizing the column takes longer than filtering: done once the user stops typing
+        self.search_timer.start()
+
+    def _show_filtered(self, nodes):
+        if self.tree_model.shown_children is not None:
+            # The rows hidden are dropped as well
+            self.tree_model.show_only(None)
+            return
+        for node in nodes:
+            self._set_node_hidden(node, False)
+
+    def _set_node_hidden(self, node, hidden):
+        index = self.tree_model.index_of(node)
+        if index.isValid():
+            self.setRowHidden(index.row(), index.parent(), hidden)
+
+    def flush_widgets(self):
+        # Propagate the changes the editors are still holding back (see PROPAGATIONS)
+        for editor in list(self.delegate.editors):
+            editor.flush()
+
+    def collect_widget_values(self):
+        # Commit the editor that might be open
+        self.flush_widgets()
+        if self.state() == QAbstractItemView.EditingState:
+            self.setCurrentIndex(QModelIndex())
+        self.tree_model.collect_values()
+
+    def node_changed(self, node):
+        self.check_dependencies(node)
+
+    def _traverse_sections(self, func):
+        # Same layout of the collapsed string used by EasyTree,
+        # index is None for the rows not shown (hidden sections)
+        def traverse(node, index):
+            if not isinstance(node, EasySubsection) or len(node.get_children()) == 0:
+                return
+            func(node, index)
+            for child in node.get_children():
+                if not isinstance(child, EasySubsection):
+                    continue
+                child_index = self.tree_model.index_of(child) if index is not None else QModelIndex()
+                traverse(child, child_index if child_index.isValid() else None)
+
+        traverse(self.node, QModelIndex())
+
+    def get_collapsed_items(self):
+        if self.search_state is not None:
+            # As it was before filtering
+            return self.search_state
+        info = []
+        self._traverse_sections(lambda node, index: info.append(
+            "1" if index is not None and self.isExpanded(index) else "0"))
+        return "".join(info)
+
+    def set_collapsed_items(self, info):
+        if info is None:
+            return
+
+        info = list(info)
+
+        def apply(node, index):
+            if len(info) == 0:
+                return
+            expanded = info.pop(0) == "1"
+            if index is not None:
+                self.setExpanded(index, expanded)
+
+        self._traverse_sections(apply)
+
+    def check_node_dependencies(self, deps):
+        conf_is_ok = True
+        for dep in deps:
+            value = self.tree_model.get_value(dep.master)
+            if isinstance(dep, EasyPairDependency):
+                ok = dep.call(value)
+                for slave in dep.get_slave():
+                    self.tree_model.set_enabled(slave, ok)
+            elif isinstance(dep, EasyMandatoryDependency):
+                ok = dep.call(value)
+                self.dependency_state.update(dep, ok)
+                self.tree_model.set_failing(dep.master, not ok)
+                conf_is_ok = conf_is_ok and ok
+        return conf_is_ok
@@ -1,29 +1,80 @@
-import base64
+import bisect
+import contextlib
+import threading
+from types import MappingProxyType
 
-from PyQt5.QtCore import QObject, pyqtSignal
-from PyQt5.QtGui import QIntValidator, QDoubleValidator
+from easyconfig2 import easystats
+from easyconfig2.easyserializer import encode_base64, decode_base64
+from easyconfig2.easystats import get_stats
+from easyconfig2.easysignal import EasySignal, EasyLazySignal
 
-from easyconfig2.easywidgets import EasyInputBoxWidget, EasyCheckBoxWidget, EasySliderWidget, EasyComboBoxWidget, \
-    EasyFileDialogWidget, EasyListWidget, EasyFileListWidget, EasyEditBoxWidget, EasyPasswordEditWidget, \
-    EasySubsectionWidget, EasyLabelWidget
+# Shared by all the nodes created without keyword arguments
+NO_KWARGS = MappingProxyType({})
 
+# Values that get() hands out marking the node as changed, since they can be
+# modified in place. The code of the package only reading the values uses
+# the value property instead, so painting or checking does not cause saves
+MUTABLE_TYPES = (list, dict, set)
 
-class EasyNode(QObject):
-    node_value_changed = pyqtSignal(object)
-    value_changed = pyqtSignal(object)
+# When the changes made in a widget are propagated (widget_value_changed):
+# at once, propagation_delay ms after the last one, when the user finishes
+# editing (releases the slider, leaves the text), or at most once every
+# propagation_delay ms
+PROPAGATIONS = ["immediate", "debounce", "release", "rate"]
+
+# Lock of the nodes not added to a configuration yet
+NO_LOCK = contextlib.nullcontext()
+
+# Node class -> frozenset of its get_arguments(), compiled once per class
+compiled_arguments = {}
+
+# Keyword arguments of a subsection pushed down to its children and the
+# attribute they set, e.g. if a subsection is hidden, all children
+INHERITED_ARGUMENTS = (("save", "save"), ("hidden", "hidden"), ("editable", "editable"),
+                       ("immediate", "immediate_update"), ("save_if_none", "save_if_none"))
+
+
+def check_propagation(kwargs):
+    # Checked when the node is created, not when its widget is
+    if kwargs.get("propagation", "immediate") not in PROPAGATIONS:
+        raise ValueError("Invalid propagation")
+    delay = kwargs.get("propagation_delay", 300)
+    if isinstance(delay, bool) or not isinstance(delay, int) or delay < 0:
+        raise ValueError("Invalid propagation delay")
+
+
+class EasyNode:
+    # NOTE: the widgets (and therefore Qt) are imported only when get_widget()
+    # is called, so the nodes can be loaded, queried and saved without Qt
+
+    # NOTE: configurations can have tens of thousands of nodes, so the nodes
+    # have no __dict__ (subclasses must declare __slots__ to stay compact)
+    # and their signals are only created when they are used
+    __slots__ = ("_node_value_changed", "_value_changed", "extended", "kwargs", "key", "widget", "item",
+                 "base64", "father", "dirty", "encoded", "pending_decode", "_value", "save", "hidden",
+                 "editable", "pretty", "save_if_none", "callback", "immediate_update", "path", "__weakref__")
+
+    node_value_changed = EasyLazySignal()
+    value_changed = EasyLazySignal()
 
     def __init__(self, key, **kwargs):
-        super().__init__()
+        self._node_value_changed = None
+        self._value_changed = None
         self.extended = False
-        self.kwargs = kwargs
+        self.kwargs = kwargs or NO_KWARGS
         self.key = key
         self.widget = None
         self.item = None
         self.base64 = kwargs.get("base64", False)
-        self.value = kwargs.get("default", None)
-        # TODO: value can be a list :
-        #  if self.base64:
-        #    self.value = base64.b64encode(self.value.encode()).decode() if self.value is not None else None
+        self.father = None
+        # The value has changed since the last get_dictionary() (see mark_dirty)
+        self.dirty = True
+        # Base64 form of the value (see get_encoded) and whether
+        # the value still has to be decoded from it (see set_encoded)
+        self.encoded = None
+        self.pending_decode = False
+        # Not through the property: the node is new, hence dirty
+        self._value = kwargs.get("default", None)
         self.save = kwargs.get("save", True)
         self.hidden = kwargs.get("hidden", False)
         self.editable = kwargs.get("editable", True)
@@ -31,22 +82,95 @@ class EasyNode(QObject):
         self.save_if_none = kwargs.get("save_if_none", True)
         self.callback = kwargs.get("callback", None)
         self.immediate_update = kwargs.get("immediate", self.callback is not None)
-        self.father = None
+        self.path = key
 
         if not self.check_kwargs():
             raise ValueError("Invalid keyword argument")
 
+    # NOTE: the cached encoded form is dropped whenever the value is assigned
+    # or a mutable value is handed out by get()
+    # NOTE: the value, its caches and the dirty flags change holding the lock
+    # of the configuration (see get_lock), so that the autosave thread never
+    # builds the values to save while another thread is setting them
+    @property
+    def value(self):
+        if self.pending_decode:
+            with self.get_lock():
+                if self.pending_decode:
+                    stats = get_stats(self)
+                    if stats is None:
+                        self._value = decode_base64(self.encoded)
+                    else:
+                        with stats.measure("base64/decode"):
+                            self._value = decode_base64(self.encoded)
+                    self.pending_decode = False
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        with self.get_lock():
+            self._value = value
+            self.encoded = None
+            self.pending_decode = False
+            self.mark_dirty()
+
+    def get_lock(self):
+        father = self.father
+        root = father.root if father is not None else None
+        return NO_LOCK if root is None else root.lock
+
+    def mark_dirty(self):
+        # The subsections containing a dirty node are dirty too: once one is
+        # found the ones above it are already marked
+        node = self
+        while node is not None and not node.dirty:
+            node.dirty = True
+            node = node.father
+
+    def get_encoded(self):
+        """Base64 form of the value, encoded only if it has changed"""
+        with self.get_lock():
+            if self.encoded is None and self.value is not None:
+                stats = get_stats(self)
+                if stats is None:
+                    self.encoded = encode_base64(self._value)
+                else:
+                    with stats.measure("base64/encode"):
+                        self.encoded = encode_base64(self._value)
+            return self.encoded
+
+    def set_encoded(self, encoded):
+        """Set the value from its base64 form, decoded when first read"""
+        with self.get_lock():
+            self._value = None
+            self.encoded = encoded
+            self.pending_decode = encoded is not None
+            self.mark_dirty()
+
+    def get_state(self):
+        """Value and encoded form as they are, see EasyTransaction"""
+        return self._value, self.encoded, self.pending_decode
+
+    def set_state(self, state):
+        with self.get_lock():
+            self._value, self.encoded, self.pending_decode = state
+            self.mark_dirty()
+
+    def has_changed(self, state):
+        """Whether the value differs from the one of a state of get_state()"""
+        value, encoded, pending_decode = state
+        if pending_decode:
+            if self.pending_decode:
+                return encoded != self.encoded
+            value = decode_base64(encoded)
+        return value != self.value
+
     def set_father(self, father):
         self.father = father
+        self.path = father.get_child_path(self.key)
 
-    # Push the kwargs down to the children
-    # E.g. if a subsection is hidden, all children
-    def update_kwargs(self, kwargs):
-        self.save = kwargs.get("save", self.save)
-        self.hidden = kwargs.get("hidden", self.hidden)
-        self.editable = kwargs.get("editable", self.editable)
-        self.immediate_update = kwargs.get("immediate", self.immediate_update)
-        self.save_if_none = kwargs.get("save_if_none", self.save_if_none)
+    def get_path(self):
+        return self.path
 
     def get_pretty(self):
         return self.pretty
@@ -67,18 +191,55 @@ class EasyNode(QObject):
         return self.base64
 
     def get(self, default=None):
-        return self.value if self.value is not None else default
+        value = self.value
+        if value is None:
+            return default
+        if isinstance(value, MUTABLE_TYPES):
+            # The caller may modify it in place: save it (and encode it) again
+            with self.get_lock():
+                self.encoded = None
+                self.mark_dirty()
+        return value
 
     def is_savable_if_none(self):
         return self.save_if_none
 
     def set(self, value):
+        transaction = self.get_transaction()
+        if transaction is not None:
+            # Notified when the transaction is committed
+            transaction.record(self)
+            self.value = value
+            return
         self.value = value
-        self.node_value_changed.emit(self)
-        self.value_changed.emit(self)
+        self.notify()
+
+    def notify(self):
+        if easystats.active:
+            stats = get_stats(self)
+            if stats is not None:
+                with stats.measure("signal/" + self.path):
+                    self.emit_signals()
+                return
+        self.emit_signals()
+
+    def emit_signals(self):
+        self.notify_widget()
+        if self._value_changed is not None:
+            self._value_changed.emit(self)
         if self.callback is not None:
             self.callback(self.value)
 
+    def notify_widget(self):
+        # Only the widget, if any, is updated
+        if self._node_value_changed is not None:
+            self._node_value_changed.emit(self)
+
+    def get_transaction(self):
+        if self.father is None or self.father.root is None:
+            return None
+        return self.father.root.transaction
+
     def use_inmediate_update(self):
         return self.immediate_update
 
@@ -89,7 +250,8 @@ class EasyNode(QObject):
         if self.value != value:
             # print("widget_changed_received: applying", value)
             self.value = value
-            self.value_changed.emit(self)
+            if self._value_changed is not None:
+                self._value_changed.emit(self)
             if self.callback is not None:
                 self.callback(self.value)
 
@@ -100,11 +262,10 @@ class EasyNode(QObject):
         return ["pretty", "save", "hidden", "immediate", "default", "enabled", "save_if_none", "base64", "callback"]
 
     def check_kwargs(self):
-
-        for key in self.kwargs.keys():
-            if key not in self.get_arguments():
-                return False
-        return True
+        arguments = compiled_arguments.get(type(self))
+        if arguments is None:
+            arguments = compiled_arguments[type(self)] = frozenset(self.get_arguments())
+        return arguments.issuperset(self.kwargs)
 
     def set_item_visible(self, visible):
         if self.item is not None:
@@ -122,8 +283,10 @@ class EasyNode(QObject):
 
 
 class EasyInputBox(EasyNode):
+    __slots__ = ()
 
     def get_widget(self):
+        from easyconfig2.easywidgets import EasyInputBoxWidget
         return EasyInputBoxWidget(self.value, **self.kwargs)
 
     def get_arguments(self):
@@ -131,17 +294,25 @@ class EasyInputBox(EasyNode):
 
 
 class EasyEditBox(EasyNode):
+    __slots__ = ()
+
+    def __init__(self, key, **kwargs):
+        check_propagation(kwargs)
+        super().__init__(key, **kwargs)
 
     def get_widget(self):
+        from easyconfig2.easywidgets import EasyEditBoxWidget
         return EasyEditBoxWidget(self.value, **self.kwargs)
 
     def get_arguments(self):
-        return super().get_arguments() + ["readonly", "max_height", "font"]
+        return super().get_arguments() + ["readonly", "max_height", "font", "propagation", "propagation_delay"]
 
 
 class EasyLabel(EasyNode):
+    __slots__ = ()
 
     def get_widget(self):
+        from easyconfig2.easywidgets import EasyLabelWidget
         return EasyLabelWidget(self.value, **self.kwargs)
 
     def get_arguments(self):
@@ -149,37 +320,51 @@ class EasyLabel(EasyNode):
 
 
 class EasyInt(EasyInputBox):
+    __slots__ = ()
 
     def __init__(self, key, **kwargs):
         if "validator" in kwargs:
             raise ValueError("Cannot set validator for EasyInt")
-        kwargs["validator"] = QIntValidator(kwargs.get("min", -2147483648), kwargs.get("max", 2147483647))
         super().__init__(key, **kwargs)
 
+    def get_widget(self):
+        from PyQt5.QtGui import QIntValidator
+        from easyconfig2.easywidgets import EasyInputBoxWidget
+        validator = QIntValidator(self.kwargs.get("min", -2147483648), self.kwargs.get("max", 2147483647))
+        return EasyInputBoxWidget(self.value, **self.kwargs, validator=validator)
+
     def get_arguments(self):
         return super().get_arguments() + ["min", "max"]
 
 
 class EasyFloat(EasyInputBox):
+    __slots__ = ()
 
     def __init__(self, key, **kwargs):
         if "validator" in kwargs:
             raise ValueError("Cannot set validator for EasyFloat")
-        kwargs["validator"] = QDoubleValidator(kwargs.get("min", -1.7976931348623157e+308),
-                                               kwargs.get("max", 1.7976931348623157e+308), 4)
         super().__init__(key, **kwargs)
 
+    def get_widget(self):
+        from PyQt5.QtGui import QDoubleValidator
+        from easyconfig2.easywidgets import EasyInputBoxWidget
+        validator = QDoubleValidator(self.kwargs.get("min", -1.7976931348623157e+308),
+                                     self.kwargs.get("max", 1.7976931348623157e+308), 4)
+        return EasyInputBoxWidget(self.value, **self.kwargs, validator=validator)
+
     def get_arguments(self):
         return super().get_arguments() + ["min", "max"]
 
 
 class EasyPasswordEdit(EasyInputBox):
+    __slots__ = ()
 
     def __init__(self, key, **kwargs):
         self.base64 = True
         super().__init__(key, **kwargs)
 
     def get_widget(self):
+        from easyconfig2.easywidgets import EasyPasswordEditWidget
         return EasyPasswordEditWidget(self.value, **self.kwargs)
 
     def get_arguments(self):
@@ -187,38 +372,94 @@ class EasyPasswordEdit(EasyInputBox):
 
 
 class EasyCheckBox(EasyNode):
+    __slots__ = ()
+
     def get_widget(self):
+        from easyconfig2.easywidgets import EasyCheckBoxWidget
         return EasyCheckBoxWidget(self.value, **self.kwargs)
 
 
 class EasySlider(EasyNode):
+    __slots__ = ()
+
+    def __init__(self, key, **kwargs):
+        check_propagation(kwargs)
+        super().__init__(key, **kwargs)
 
     def get_widget(self):
+        from easyconfig2.easywidgets import EasySliderWidget
         return EasySliderWidget(self.value, **self.kwargs)
 
     def get_arguments(self):
-        return super().get_arguments() + ["min", "max", "den", "format", "show_value", "suffix", "align"]
+        return super().get_arguments() + ["min", "max", "den", "format", "show_value", "suffix", "align", "propagation",
+                                          "propagation_delay"]
 
 
 class EasyComboBox(EasyNode):
+    __slots__ = ("items", "items_index")
+
+    def __init__(self, key, **kwargs):
+        super().__init__(key, **kwargs)
+        # Produced when first needed, see get_items and find_items
+        self.items = None
+        self.items_index = None
 
     def get_items(self):
-        return self.kwargs.get("items", [])
+        """The items are a list, a callable returning them or an iterable
+        (e.g. a generator). They are produced the first time they are needed
+        and kept for the next widgets, until set_items()"""
+        if self.items is None:
+            items = self.kwargs.get("items", [])
+            if callable(items):
+                items = items()
+            self.items = items if isinstance(items, list) else list(items)
+        return self.items
+
+    def set_items(self, items):
+        # Used by the widgets created afterwards
+        self.kwargs = {**self.kwargs, "items": items}
+        self.items = None
+        self.items_index = None
 
     def get_item(self, index):
-        items = self.kwargs.get("items", [])
+        items = self.get_items()
         return items[index] if index < len(items) else None
 
+    def find_items(self, text, count=100):
+        """Indexes of up to count items containing text (ignoring case), those
+        starting with it first. A sorted index of the items is built on the
+        first search, so the prefix matches are found by bisection"""
+        if self.items_index is None:
+            self.items_index = sorted((str(item).lower(), i) for i, item in enumerate(self.get_items()))
+        text = text.lower()
+        index = self.items_index
+        matches = []
+        position = bisect.bisect_left(index, (text,))
+        while position < len(index) and len(matches) < count and index[position][0].startswith(text):
+            matches.append(index[position][1])
+            position += 1
+        if len(matches) < count:
+            for name, i in index:
+                if text in name and not name.startswith(text):
+                    matches.append(i)
+                    if len(matches) == count:
+                        break
+        return matches
+
     def get_widget(self):
-        return EasyComboBoxWidget(self.value, **self.kwargs)
+        from easyconfig2.easywidgets import EasyComboBoxWidget
+        return EasyComboBoxWidget(self.value, **{**self.kwargs, "items": self.get_items()},
+                                  find_items=self.find_items)
 
     def get_arguments(self):
-        return super().get_arguments() + ["items"]
+        return super().get_arguments() + ["items", "filter"]
 
 
 class EasyFileDialog(EasyNode):
+    __slots__ = ()
 
     def get_widget(self):
+        from easyconfig2.easywidgets import EasyFileDialogWidget
         return EasyFileDialogWidget(self.value, **self.kwargs)
 
     def get_arguments(self):
@@ -226,6 +467,7 @@ class EasyFileDialog(EasyNode):
 
 
 class EasyPrivateNode(EasyNode):
+    __slots__ = ()
 
     def __init__(self, key, **kwargs):
         super().__init__(key, **kwargs)
@@ -233,6 +475,7 @@ class EasyPrivateNode(EasyNode):
 
 
 class EasyList(EasyNode):
+    __slots__ = ()
 
     def __init__(self, key, **kwargs):
         super().__init__(key, **kwargs)
@@ -241,10 +484,12 @@ class EasyList(EasyNode):
         return super().get_arguments() + ["validator", "height"]
 
     def get_widget(self):
+        from easyconfig2.easywidgets import EasyListWidget
         return EasyListWidget(self.value, **self.kwargs)
 
 
 class EasyFileList(EasyNode):
+    __slots__ = ()
 
     def __init__(self, key, **kwargs):
         super().__init__(key, **kwargs)
@@ -253,81 +498,114 @@ class EasyFileList(EasyNode):
         return super().get_arguments() + ["type", "height"]
 
     def get_widget(self):
+        from easyconfig2.easywidgets import EasyFileListWidget
         return EasyFileListWidget(self.value, **self.kwargs)
 
 
 class EasySubsection(EasyNode):
+    __slots__ = ("node_children", "children_by_key", "dictionary", "easyconfig", "root", "inherited", "accessor",
+                 "values_accessor")
 
     def __init__(self, key, **kwargs):
         super().__init__(key, **kwargs)
+        # (attribute, value) set on every child, see INHERITED_ARGUMENTS
+        self.inherited = tuple((attribute, kwargs[key]) for key, attribute in INHERITED_ARGUMENTS
+                               if key in kwargs)
         self.node_children = []
+        self.children_by_key = {}
+        # Values of the subtree as of the last get_dictionary(), rebuilt when dirty
+        self.dictionary = None
         self.easyconfig = None
+        self.root = None
+        # Generated when first needed, see get_accessor
+        self.accessor = None
+        self.values_accessor = None
 
     def set_easyconfig(self, easyconfig):
         self.easyconfig = easyconfig
 
-    def set_nested_attr(self, obj, attrs, value):
-
-        class Dummy:
-            pass
-
-        for attr in attrs[:-1]:
-            if not hasattr(obj, attr):
-                setattr(obj, attr, Dummy())
-            obj = getattr(obj, attr)
-        setattr(obj, attrs[-1], value)
+    def set_root(self, root):
+        # Needed when a subsection is filled before being added to the tree:
+        # the paths of the children change and they have to be indexed
+        self.root = root
+        for child in self.node_children:
+            child.path = self.get_child_path(child.get_key())
+            if root is not None:
+                root.register(child)
+            if isinstance(child, EasySubsection):
+                child.set_root(root)
+
+    def get_child_path(self, key):
+        return self.path + "/" + key
+
+    def get_accessor(self, values=False):
+        """Object whose attributes are the children of the subsection, the
+        accessors for the subsections, as in config.ss1.ss3.ss3_string_1.
+        With values the attributes of the options are their values (setting
+        them sets the options). Generated when first needed"""
+        from easyconfig2.easyaccessor import make_accessor
+        if values:
+            if self.values_accessor is None:
+                self.values_accessor = make_accessor(self, True)
+            return self.values_accessor
+        if self.accessor is None:
+            self.accessor = make_accessor(self)
+        return self.accessor
+
+    def add_accessor_fields(self, children):
+        from easyconfig2.easyaccessor import add_accessor_fields
+        if self.accessor is not None:
+            add_accessor_fields(self.accessor, children, False)
+        if self.values_accessor is not None:
+            add_accessor_fields(self.values_accessor, children, True)
 
     def add_child(self, child):
-
-        child.update_kwargs(self.kwargs)
-        child.set_father(self)
-
-        if isinstance(child, EasySubsection):
-            child.set_easyconfig(self.easyconfig)
-        else:
-
-            # Create fields to be accessed like self.config.ss1.ss1_string_1
-            fields = [child.get_key()]
-            p = child.father
-            while p is not None:
-                fields.append(p.get_key())
-                p = p.father
-            fields.reverse()
-
-            self.set_nested_attr(self.easyconfig, fields[1:], child)
-
-            # field_key = ""
-            # for f in fields:
-            #     if not hasattr(self.easyconfig, f):
-            #         setattr(self.easyconfig, f, None)
-            #
-            # for i, f in enumerate(fields[1:]):
-            #     field_key += ("_" if i != 0 else "") + f
-            # setattr(self.easyconfig, field_key, child)
-            # print(field_key, "set to", child)
-
-            # if hasattr(self.easyconfig, child.get_key()):
-            #     print("WARNING: clash for key", child.get_key(), ":", getattr(self.easyconfig, child.get_key()),
-            #           "owns it")
-            # else:
-            #     setattr(self.easyconfig, child.get_key(), child)
-
-        self.node_children.append(child)
+        self.add_children([child])
         return child
 
+    def add_children(self, children):
+        """Add many nodes at once: what they have in common (inherited
+        arguments, dirty flags, accessors) is done once for all"""
+        children = list(children)
+        if self.root is self:
+            for child in children:
+                self.easyconfig.check_child_key(child)
+        for child in children:
+            for attribute, value in self.inherited:
+                setattr(child, attribute, value)
+            child.set_father(self)
+
+            if isinstance(child, EasySubsection):
+                child.set_easyconfig(self.easyconfig)
+                child.set_root(self.root)
+
+            if self.root is self:
+                self.easyconfig.set_child_attribute(child)
+
+            self.node_children.append(child)
+            # The first child with a given key wins, as in a linear search
+            self.children_by_key.setdefault(child.key, child)
+            if self.root is not None:
+                self.root.register(child)
+        self.mark_dirty()
+        if self.accessor is not None or self.values_accessor is not None:
+            self.add_accessor_fields(children)
+        return children
+
     def get_child(self, key, node=None):
         if key is None and node is not None:
             key = node.get_key()
 
-        for child in self.node_children:
-            if child.get_key() == key:
-                return child
+        child = self.children_by_key.get(key)
+        if child is not None:
+            return child
         if node is not None:
             return self.add_child(node)
 
         return None
 
     def get_widget(self):
+        from easyconfig2.easywidgets import EasySubsectionWidget
         return EasySubsectionWidget(None, **self.kwargs)
 
     def get_arguments(self):
@@ -337,20 +615,20 @@ class EasySubsection(EasyNode):
         return self.node_children
 
     def get_node(self, path):
-        path = path.strip("/").split("/")
-
-        # print("path", path)
-
-        def get_node_recursive(node, path2):
-            for child in node.node_children:
-                if len(path2) == 1 and child.get_key() == path2[0]:
-                    return child
-                if isinstance(child, EasySubsection):
-                    if child.get_key() == path2[0]:
-                        return get_node_recursive(child, path2[1:])
-            return None
-
-        return get_node_recursive(self, path)
+        path = path.strip("/")
+
+        # Constant time lookup if the subsection belongs to a tree
+        if self.root is not None:
+            return self.root.paths.get(self.get_child_path(path))
+
+        node = self
+        for key in path.split("/"):
+            if not isinstance(node, EasySubsection):
+                return None
+            node = node.children_by_key.get(key)
+            if node is None:
+                return None
+        return node
 
     # Utility function to add a subsection
     def addCombobox(self, key, **kwargs):
@@ -487,6 +765,51 @@ class EasySubsection(EasyNode):
 
 
 class Root(EasySubsection):
+    __slots__ = ("paths", "node_added", "transaction", "stats", "lock")
+
     def __init__(self, easyconfig, **kwargs):
         super().__init__("root", **kwargs)
         self.easyconfig = easyconfig
+        self.root = self
+        # Full path (without "root") -> node of the whole tree
+        self.paths = {}
+        self.node_added = EasySignal()
+        self.transaction = None
+        # EasyStats of the configuration if enabled
+        self.stats = None
+        # Held while the values of the nodes change or are collected, see get_lock
+        self.lock = threading.RLock()
+
+    def get_child_path(self, key):
+        return key
+
+    def register(self, node):
+        self.paths.setdefault(node.get_path(), node)
+        self.node_added.emit(node)
+
+
+class EasyTransaction:
+    """Values set while a transaction is open are not notified: at commit
+    each changed node emits its signals (which refresh the widgets and check
+    its dependencies) and calls its callback once. On rollback the previous
+    values are restored silently"""
+
+    def __init__(self):
+        self.previous = {}
+
+    def record(self, node):
+        # Keep the state the node had before the transaction, the value
+        # of a base64 node may still be encoded (see EasyNode.set_encoded)
+        if node not in self.previous:
+            self.previous[node] = node.get_state()
+
+    def commit(self):
+        for node, state in self.previous.items():
+            if node.has_changed(state):
+                node.notify()
+        self.previous.clear()
+
+    def rollback(self):
+        for node, state in self.previous.items():
+            node.set_state(state)
+        self.previous.clear()
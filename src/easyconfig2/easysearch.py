@@ -0,0 +1,93 @@
+from easyconfig2.easynodes import EasySubsection
+
+# Separates the texts of a node, no search can match across it
+SEPARATOR = "\0"
+
+# Sizing a column measures all the rows shown: worth it only for a few
+MAX_RESIZED_ROWS = 200
+
+
+class EasySearchIndex:
+    """Case-insensitive index of the pretty labels and paths (thus the keys)
+    of the nodes shown in a tree (those below node that are not hidden),
+    built once. A search extending the previous one (the user typing) only
+    checks the nodes that matched it"""
+
+    def __init__(self, node):
+        self.node = node
+        self.nodes = []
+        self.add_children(node)
+        self.texts = [(str(node.pretty) + SEPARATOR + node.path).lower() for node in self.nodes]
+        self.all_nodes = set(self.nodes)
+        self.positions = {node: i for i, node in enumerate(self.nodes)}
+        self.last = None
+        # Nodes shown by filter(), the others are hidden
+        self.shown = self.all_nodes
+
+    def add_children(self, node):
+        for child in node.get_children():
+            if not child.hidden:
+                self.nodes.append(child)
+                if isinstance(child, EasySubsection):
+                    self.add_children(child)
+
+    def search(self, text):
+        """Positions in self.nodes of the nodes whose key, pretty label or
+        path contains text"""
+        text = text.lower()
+        texts = self.texts
+        if self.last is not None and text.startswith(self.last[0]):
+            matches = [i for i in self.last[1] if text in texts[i]]
+        else:
+            matches = [i for i, name in enumerate(texts) if text in name]
+        self.last = (text, matches)
+        return matches
+
+    def filter(self, text):
+        """Nodes to hide and to show so that only those matching text and
+        their subsections are shown, and the subsections to expand"""
+        last = self.last
+        matches = self.search(text)
+        if last is not None and len(matches) == len(last[1]) and text.lower().startswith(last[0]):
+            # Narrowed to the same nodes, nothing changes
+            return set(), set(), set()
+        nodes = self.nodes
+        shown = {nodes[i] for i in matches}
+        # Add the subsections above the matches, up to self.node
+        missing = {node.father for node in shown}
+        shown.add(self.node)
+        missing -= shown
+        while missing:
+            shown |= missing
+            missing = {node.father for node in missing} - shown
+        shown.discard(self.node)
+        expand = {node.father for node in shown}
+
+        # Typing narrows the search: the sets compared get smaller
+        hide = self.shown - shown
+        show = shown - self.shown
+        self.shown = shown
+        return hide, show, expand
+
+    def is_filtered(self, node):
+        """Whether filter() hides the node"""
+        return node in self.all_nodes and node not in self.shown
+
+    def is_narrow(self):
+        """Few enough nodes shown by the filter to resize the tree to them"""
+        return len(self.shown) <= MAX_RESIZED_ROWS
+
+    def get_shown_children(self):
+        """Children shown by filter() of each subsection, in their order"""
+        children = {}
+        for i in sorted(self.positions[node] for node in self.shown):
+            node = self.nodes[i]
+            children.setdefault(node.father, []).append(node)
+        return children
+
+    def clear(self):
+        """Nodes hidden by filter(), to be shown again"""
+        show = self.all_nodes - self.shown
+        self.shown = self.all_nodes
+        self.last = None
+        return show
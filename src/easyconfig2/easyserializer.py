@@ -0,0 +1,77 @@
+import base64
+import json
+import os
+
+import yaml
+
+# Use the libyaml bindings when PyYAML has been built with them
+try:
+    from yaml import CSafeLoader as SafeLoader, CDumper as Dumper
+except ImportError:
+    from yaml import SafeLoader, Dumper
+
+
+class EasySerializer:
+    extensions = ()
+
+    def loads(self, string):
+        raise NotImplementedError
+
+    def dumps(self, data):
+        raise NotImplementedError
+
+
+class EasyYamlSerializer(EasySerializer):
+    extensions = (".yaml", ".yml")
+
+    def __init__(self, loader=SafeLoader, dumper=Dumper):
+        self.loader = loader
+        self.dumper = dumper
+
+    def loads(self, string):
+        return yaml.load(string, Loader=self.loader)
+
+    def dumps(self, data):
+        return yaml.dump(data, Dumper=self.dumper)
+
+
+class EasyJsonSerializer(EasySerializer):
+    extensions = (".json",)
+
+    def loads(self, string):
+        return json.loads(string)
+
+    def dumps(self, data):
+        return json.dumps(data, indent=2)
+
+
+yaml_serializer = EasyYamlSerializer()
+serializers = [yaml_serializer, EasyJsonSerializer()]
+
+
+def register_serializer(serializer):
+    # Registered last, wins over the previous ones for the same extension
+    serializers.insert(0, serializer)
+
+
+def get_serializer(filename=None):
+    """Serializer for a file according to its extension, YAML by default"""
+    if filename is not None:
+        extension = os.path.splitext(filename)[1].lower()
+        for serializer in serializers:
+            if extension in serializer.extensions:
+                return serializer
+    return yaml_serializer
+
+
+def encode_base64(value):
+    # NOTE: we use yaml to dump the value to ensure that
+    # the value is stored according to the type it has and
+    # to take into account that might be a list or a dict
+    encoded = base64.b64encode(yaml_serializer.dumps(value).encode()).decode()
+    # Same as " ".join(textwrap.wrap(encoded, 80)), there are no spaces to break at
+    return " ".join(encoded[i:i + 80] for i in range(0, len(encoded), 80))
+
+
+def decode_base64(encoded):
+    return yaml_serializer.loads(base64.b64decode(encoded.replace(" ", "")))
@@ -0,0 +1,59 @@
+import inspect
+import weakref
+
+
+class EasySignal:
+    """Minimal replacement of pyqtSignal so the nodes can be used without Qt.
+    As PyQt does, bound methods are referenced weakly so connecting a
+    method does not keep its object alive"""
+
+    def __init__(self):
+        self.slots = []
+
+    def connect(self, slot):
+        if inspect.ismethod(slot):
+            self.slots.append(weakref.WeakMethod(slot))
+        else:
+            self.slots.append(slot)
+
+    def disconnect(self, slot=None):
+        if slot is None:
+            self.slots.clear()
+            return
+        for i, connected in enumerate(self.slots):
+            target = connected() if isinstance(connected, weakref.WeakMethod) else connected
+            if target == slot:
+                del self.slots[i]
+                return
+        raise TypeError("Slot is not connected")
+
+    def emit(self, *args):
+        if not self.slots:
+            return
+        for connected in list(self.slots):
+            if isinstance(connected, weakref.WeakMethod):
+                slot = connected()
+                if slot is None:
+                    self.slots.remove(connected)
+                    continue
+            else:
+                slot = connected
+            slot(*args)
+
+
+class EasyLazySignal:
+    """Class attribute giving each instance its own EasySignal, created the
+    first time it is accessed and stored in the "_" + name slot. Until then
+    the slot is None and there is nothing to emit"""
+
+    def __set_name__(self, owner, name):
+        self.slot = "_" + name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        signal = getattr(instance, self.slot)
+        if signal is None:
+            signal = EasySignal()
+            setattr(instance, self.slot, signal)
+        return signal
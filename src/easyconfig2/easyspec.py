@@ -0,0 +1,153 @@
+import collections
+import hashlib
+import itertools
+import json
+import os
+import tempfile
+
+from easyconfig2.easynodes import EasySubsection, EasyInputBox, EasyEditBox, EasyLabel, EasyInt, EasyFloat, \
+    EasyPasswordEdit, EasyCheckBox, EasySlider, EasyComboBox, EasyFileDialog, EasyPrivateNode, EasyList, \
+    EasyFileList
+from easyconfig2.easyserializer import get_serializer
+
+# Changed when the format of the compiled specs changes, invalidates the cache
+SPEC_VERSION = "2"
+
+# Type of a node in a spec -> class and the arguments its addXxx adds
+NODE_TYPES = {
+    "subsection": (EasySubsection, {}),
+    "hidden": (EasySubsection, {"hidden": True}),
+    "string": (EasyInputBox, {}),
+    "editbox": (EasyEditBox, {}),
+    "label": (EasyLabel, {}),
+    "int": (EasyInt, {}),
+    "float": (EasyFloat, {}),
+    "password": (EasyPasswordEdit, {}),
+    "checkbox": (EasyCheckBox, {}),
+    "slider": (EasySlider, {}),
+    "combobox": (EasyComboBox, {}),
+    "file": (EasyFileDialog, {"type": "file"}),
+    "folder": (EasyFileDialog, {"type": "dir"}),
+    "private": (EasyPrivateNode, {}),
+    "list": (EasyList, {}),
+    "filelist": (EasyFileList, {}),
+}
+
+
+def compile_spec(spec):
+    """Flatten a spec into a list of (parent index, type, key, kwargs) in
+    the order the nodes have to be created, -1 being the subsection the spec
+    is built into. A spec maps each key to the arguments of its node plus its
+    "type" and, for subsections, their "children" spec, e.g.
+
+        network:
+          type: subsection
+          children:
+            host: {type: string, default: localhost}
+    """
+    compiled = []
+    pending = collections.deque([(-1, spec)])
+    while pending:
+        parent, children = pending.popleft()
+        for key, entry in children.items():
+            if not isinstance(entry, dict):
+                raise ValueError("Invalid spec for {}".format(key))
+            kwargs = dict(entry)
+            children_spec = kwargs.pop("children", None)
+            kind = kwargs.pop("type", "subsection" if children_spec is not None else None)
+            if kind not in NODE_TYPES:
+                raise ValueError("Unknown node type {} for {}".format(kind, key))
+            cls, arguments = NODE_TYPES[kind]
+            if children_spec is not None and not issubclass(cls, EasySubsection):
+                raise ValueError("Only subsections can have children ({})".format(key))
+
+            compiled.append((parent, kind, str(key), {**kwargs, **arguments}))
+            if children_spec:
+                pending.append((len(compiled) - 1, children_spec))
+    return compiled
+
+
+def get_digest(data):
+    return hashlib.sha1(SPEC_VERSION.encode() + data).hexdigest()
+
+
+def load_compiled(path):
+    # Anything that is not a valid compiled spec is a cache miss
+    try:
+        with open(path, encoding="utf-8") as f:
+            compiled = [tuple(entry) for entry in json.load(f)]
+        for index, (parent, kind, key, kwargs) in enumerate(compiled):
+            if not (isinstance(parent, int) and -1 <= parent < index and kind in NODE_TYPES
+                    and isinstance(key, str) and isinstance(kwargs, dict)):
+                return None
+        return compiled
+    except Exception:
+        return None
+
+
+def store_compiled(path, compiled):
+    # Only stored if reading it back gives the same spec (e.g. not
+    # for YAML dates or non-string keys, which JSON cannot keep)
+    try:
+        data = json.dumps(compiled)
+    except (TypeError, ValueError):
+        return
+    if json.loads(data) != [list(entry) for entry in compiled]:
+        return
+    # Written to a temporary file and renamed, so a concurrent startup
+    # never reads a partially written cache
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(data)
+    os.replace(temporary, path)
+
+
+def get_compiled_spec(spec, cache_dir=None):
+    """Compiled form of a spec (a dictionary or the name of a YAML/JSON file).
+    With cache_dir the compiled spec is stored there, named after the hash of
+    the spec, and reused while the spec does not change: for a file neither
+    parsing it nor compiling it is needed. A dictionary holding values that
+    cannot be stored (e.g. callables) is compiled without the cache"""
+    if isinstance(spec, dict):
+        if cache_dir is None:
+            return compile_spec(spec)
+        try:
+            # Not sorted: the order of the keys is the order of the nodes
+            data = json.dumps(spec).encode()
+        except (TypeError, ValueError):
+            return compile_spec(spec)
+    else:
+        with open(spec, "rb") as f:
+            data = f.read()
+        if cache_dir is None:
+            return compile_spec(get_serializer(spec).loads(data.decode()))
+
+    path = os.path.join(cache_dir, get_digest(data) + ".json")
+    compiled = load_compiled(path)
+    if compiled is None:
+        if not isinstance(spec, dict):
+            spec = get_serializer(spec).loads(data.decode())
+        compiled = compile_spec(spec)
+        store_compiled(path, compiled)
+    return compiled
+
+
+def build_spec(compiled, subsection):
+    """Create the nodes of a compiled spec and add them to the subsection.
+    The children of a subsection are consecutive in the compiled spec and
+    come after it, so each group is added at once to a subsection that is
+    already in the tree"""
+    nodes = []
+    for parent, group in itertools.groupby(compiled, key=lambda entry: entry[0]):
+        father = subsection if parent == -1 else nodes[parent]
+        children = []
+        for _, kind, key, kwargs in group:
+            cls = NODE_TYPES[kind][0]
+            if cls is EasyList and father.hidden:
+                # As addList does
+                cls = EasyPrivateNode
+            children.append(cls(key, **kwargs))
+        father.add_children(children)
+        nodes.extend(children)
+    return nodes
@@ -0,0 +1,101 @@
+import contextlib
+import threading
+import time
+
+# Number of EasyStats enabled in the process: while it is 0 the
+# instrumented code only pays for checking it
+active = 0
+
+NOT_MEASURED = contextlib.nullcontext()
+
+
+class EasyStats:
+    """Durations and call counts of the operations of a configuration, keyed
+    by name: "load", "parse", "save", "serialize", "get_dictionary",
+    "base64/encode", "base64/decode", "tree/populate", "widget/<node class>",
+    "signal/<path>" and "dependency/<function>".
+    The hook, if given, is called with the name of each measured operation
+    and must return a context manager wrapping it, so external profilers can
+    mark it (e.g. lambda name: tracer.span(name))"""
+
+    def __init__(self, hook=None):
+        self.entries = {}
+        self.hook = hook
+        self.notifier = None
+        # Operations are also measured in the autosave and watcher threads
+        self.lock = threading.Lock()
+
+    def record(self, name, elapsed):
+        with self.lock:
+            entry = self.entries.get(name)
+            if entry is None:
+                entry = self.entries[name] = {"count": 0, "time": 0.0, "max": 0.0}
+            entry["count"] += 1
+            entry["time"] += elapsed
+            if elapsed > entry["max"]:
+                entry["max"] = elapsed
+        if self.notifier is not None:
+            self.notifier.recorded.emit(name, elapsed)
+
+    @contextlib.contextmanager
+    def measure(self, name):
+        hook = self.hook(name) if self.hook is not None else NOT_MEASURED
+        with hook:
+            start = time.perf_counter()
+            try:
+                yield
+            finally:
+                self.record(name, time.perf_counter() - start)
+
+    def get_stats(self):
+        """Copy of the entries: name -> {"count", "time", "max"}"""
+        with self.lock:
+            return {name: dict(entry) for name, entry in self.entries.items()}
+
+    def get_slowest(self, prefix="", count=10, key="max"):
+        """Names and entries starting with prefix, the slowest first"""
+        stats = [(name, entry) for name, entry in self.get_stats().items() if name.startswith(prefix)]
+        stats.sort(key=lambda item: item[1][key], reverse=True)
+        return stats[:count]
+
+    def reset(self):
+        with self.lock:
+            self.entries.clear()
+
+    def get_notifier(self):
+        """QObject whose recorded(str, float) signal is emitted for every
+        measured operation"""
+        if self.notifier is None:
+            from PyQt5.QtCore import QObject, pyqtSignal
+
+            class EasyStatsNotifier(QObject):
+                recorded = pyqtSignal(str, float)
+
+            self.notifier = EasyStatsNotifier()
+        return self.notifier
+
+
+def get_stats(node):
+    """EasyStats of the configuration of a node, None if it is disabled"""
+    if not active:
+        return None
+    father = node if node.father is None else node.father
+    root = getattr(father, "root", None)
+    return None if root is None else root.stats
+
+
+def get_function_name(func):
+    code = getattr(func, "__code__", None)
+    name = getattr(func, "__qualname__", repr(func))
+    if code is None:
+        return name
+    return "{} ({}:{})".format(name, code.co_filename, code.co_firstlineno)
+
+
+def get_widget(node):
+    """node.get_widget(), timed per class of node if the statistics are enabled"""
+    stats = get_stats(node)
+    if stats is None:
+        return node.get_widget()
+    with stats.measure("widget/" + type(node).__name__):
+        return node.get_widget()
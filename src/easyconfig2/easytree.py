@@ -1,29 +1,53 @@
 from PyQt5.QtCore import pyqtSignal, Qt
 from PyQt5.QtWidgets import QTreeWidget, QTreeWidgetItem, QAbstractItemView
 
-from easyconfig2.easydependency import EasyPairDependency, EasyMandatoryDependency
+from easyconfig2.easydependency import EasyPairDependency, EasyMandatoryDependency, EasyDependencyState
 from easyconfig2.easynodes import EasySubsection
+from easyconfig2.easystats import get_stats, get_widget
+from easyconfig2.easytreemixin import EasyTreeMixin, is_own_thread
 from easyconfig2.easywidgets import EasySubsectionWidget
 from easyconfig2.tripledict import TripleDict
 
 
-class EasyTree(QTreeWidget):
+class EasyTree(EasyTreeMixin, QTreeWidget):
     config_ok = pyqtSignal(bool)
+    # Nodes set in another thread, see node_notified
+    node_queued = pyqtSignal(object)
 
-    def __init__(self, node, dependencies):
+    def __init__(self, node, dependencies, lazy=False):
         super().__init__()
         self.node = node
         self.dependencies = dependencies
+        self.lazy = lazy
         self.items = TripleDict()
+        # Subsection items whose children have not been created yet (lazy mode)
+        # NOTE: QTreeWidgetItem is not hashable, keyed by id() and the item is
+        # stored as well to keep the wrapper alive
+        self.pending = {}
+        self.connected = set()
+        self.dependency_state = EasyDependencyState()
+        self.last_ok = True
+        self.init_search()
         self.header().setVisible(False)
         self.setSelectionMode(QAbstractItemView.NoSelection)
-        self.expanded.connect(self.tree_expanded)
-        self.collapsed.connect(self.tree_expanded)
-        self.expanded.connect(lambda: self.resizeColumnToContents(0))
+        self.itemExpanded.connect(self.item_expanded)
+        self.node_queued.connect(self.node_value_changed, Qt.QueuedConnection)
         self.setColumnCount(2)
+        # The nodes outlive the tree: stop notifying it once destroyed
+        self.destroyed.connect(lambda: self.disconnect_nodes())
+
+        # The masters of the dependencies must be followed even
+        # if their widgets have not been created yet (lazy mode)
+        for master in self.dependencies.keys():
+            self._connect_node(master)
 
         # Populate the tree
-        self.populate(node)
+        stats = get_stats(node)
+        if stats is None:
+            self.populate(node)
+        else:
+            with stats.measure("tree/populate"):
+                self.populate(node)
         # Hide the hidden nodes
         self.hide_hidden(node)
 
@@ -32,47 +56,128 @@ class EasyTree(QTreeWidget):
             index = proxy.index(row, 0)
             self.expand(index)
         self.resizeColumnToContents(0)
+        self.connect_expansion()
         self.check_all_dependencies()
 
-    def tree_expanded(self):
-        self.node.get_node("easyconfig/collapsed").set(self.get_collapsed_items())
-
     def update(self):
-        state = self.get_collapsed_items()
-        self.clear()
-        self.items.clear()
-        self.populate(self.node)
+        """Bring the tree in line with the nodes: only the items of the nodes
+        added or removed since the last update are created or destroyed, the
+        others keep their widgets, connections and expansion state"""
+        self._reconcile(self.node, self.invisibleRootItem())
         self.hide_hidden(self.node)
-        self.set_collapsed_items(state)
+        # The nodes may have changed: index them again
+        self.search_index = None
+        if self.search_state is not None:
+            self._apply_filter(self.search_text)
+        self.check_all_dependencies()
+
+    def _reconcile(self, node, parent_item):
+        children = node.get_children()
+        wanted = set(children)
+
+        # Remove the items whose nodes are not children anymore
+        for i in reversed(range(parent_item.childCount())):
+            info = self.items.get_by_item(parent_item.child(i))
+            if info is not None and info[0] not in wanted:
+                self._remove_item(parent_item, i, info[0])
+
+        for i, child in enumerate(children):
+            info = self.items.get(child)
+            if info is not None and parent_item.child(i) is not info[1]:
+                # The node has been moved, build it again in its new place
+                self._remove_item(parent_item, parent_item.indexOfChild(info[1]), child)
+                info = None
+
+            if info is None:
+                if isinstance(child, EasySubsection):
+                    self.populate(child, parent_item, i)
+                else:
+                    self._create_widget_item(child, parent_item, i)
+            elif isinstance(child, EasySubsection):
+                item = info[1]
+                pending = self.pending.get(id(item))
+                if pending is None:
+                    self._reconcile(child, item)
+                elif item.childCount() == 0 and len(child.get_children()) > 0:
+                    # Not materialized: it only needs the placeholder
+                    QTreeWidgetItem(item)
+
+    def _remove_item(self, parent_item, index, node):
+        item = parent_item.takeChild(index)
+        parent_widget = self.itemWidget(parent_item, 1)
+        widget, _ = self.items.get(node)
+        if parent_widget is not None and widget is not None:
+            parent_widget.remove_child_widget(widget)
+        self._forget(node, item)
+
+    def _forget(self, node, item):
+        """Drop all the references to the items of a removed subtree"""
+        self.pending.pop(id(item), None)
+        if self.items.get(node) is not None:
+            self.items.remove(node)
+        if node in self.connected and node not in self.dependencies:
+            node.node_value_changed.disconnect(self.node_notified)
+            self.connected.discard(node)
+        for i in range(item.childCount()):
+            child_item = item.child(i)
+            info = self.items.get_by_item(child_item)
+            if info is not None:
+                self._forget(info[0], child_item)
+
+    def flush_widgets(self):
+        # Propagate the changes the widgets are still holding back (see PROPAGATIONS)
+        for _, (widget, _) in self.items.items1():
+            if widget is not None:
+                widget.flush()
 
     def collect_widget_values(self):
+        # Nodes not materialized yet (lazy mode) have no widget
+        # and therefore keep their current value
+        self.flush_widgets()
         for node, (widget, _) in self.items.items1():
             if widget is not None:
                 node.update_value(widget.get_value())
 
     def hide_hidden(self, node):
         for child in node.get_children():
+            info = self.items[child]
+            if info is None:
+                # Not materialized yet, will be hidden when created
+                continue
+            _, item = info
+            item.setHidden(child.is_hidden())
             if isinstance(child, EasySubsection):
-                # print(child.get_pretty(), child.is_hidden())
-                _, item = self.items[child]
-                item.setHidden(child.is_hidden())
                 self.hide_hidden(child)
-            else:
-                _, item = self.items[child]
-                item.setHidden(child.is_hidden())
 
     def widget_value_changed(self, widget):
         node, _ = self.items.get(widget)
         if node.use_inmediate_update():
             node.update_value(widget.get_value())
-        self.check_all_dependencies()
+        self.check_dependencies(node)
+
+    def node_notified(self, node):
+        if is_own_thread(self):
+            self.node_value_changed(node)
+        else:
+            self.node_queued.emit(node)
 
     def node_value_changed(self, node):
-        widget, _ = self.items.get(node)
-        widget.set_value(node.get())
-        self.check_all_dependencies()
+        info = self.items.get(node)
+        if info is not None and info[0] is not None:
+            info[0].set_value(node.value)
+        self.check_dependencies(node)
+
+    def _connect_node(self, node):
+        if node not in self.connected:
+            node.node_value_changed.connect(self.node_notified)
+            self.connected.add(node)
 
-    def _create_widget_item(self, node, parent_item: QTreeWidgetItem):
+    def disconnect_nodes(self):
+        for node in self.connected:
+            node.node_value_changed.disconnect(self.node_notified)
+        self.connected.clear()
+
+    def _create_widget_item(self, node, parent_item: QTreeWidgetItem, index=None):
         """Create the items of the tree and insert the widgets according to those
         returned by the nodes themselves. Also, store in the EasySubsectionWidget
         the children widgets, so they can be disabled when the parent is disabled.
@@ -80,9 +185,13 @@ class EasyTree(QTreeWidget):
         the nodes, so a node will be updated when the widget changes and vice versa.
         This process is carried out by widget_value_changed and node_value_changed methods."""
 
-        item = QTreeWidgetItem(parent_item)
+        if index is None:
+            item = QTreeWidgetItem(parent_item)
+        else:
+            item = QTreeWidgetItem()
+            parent_item.insertChild(index, item)
         item.setText(0, node.get_pretty())
-        widget = node.get_widget()
+        widget = get_widget(node)
         if widget is not None:
             if parent_item is not None and self.itemWidget(parent_item, 1) is not None:
                 # Need to add the widget to the parent widget: it has to know
@@ -91,29 +200,107 @@ class EasyTree(QTreeWidget):
                 parent_widget.add_child_widget(widget)
 
             widget.widget_value_changed.connect(self.widget_value_changed)
-            node.node_value_changed.connect(self.node_value_changed)
+            self._connect_node(node)
             self.setItemWidget(item, 1, widget)
         self.items.add(node, widget, item)
         return item
 
-    def populate(self, node, parent_item=None):
-        """Populate the tree with the nodes of the configuration"""
+    def populate(self, node, parent_item=None, index=None):
+        """Populate the tree with the nodes of the configuration. In lazy mode
+        the children of a subsection are not created until it is expanded,
+        a placeholder item is used to show the expand arrow instead."""
 
         if parent_item is not None:
-            parent_item = self._create_widget_item(node, parent_item)
+            parent_item = self._create_widget_item(node, parent_item, index)
+            if self.lazy:
+                self._defer(node, parent_item)
+                return
         else:
             parent_item = self.invisibleRootItem()
 
+        self._populate_children(node, parent_item)
+
+    def _populate_children(self, node, parent_item):
         for child_node in node.get_children():
             if isinstance(child_node, EasySubsection):
                 self.populate(child_node, parent_item)
             else:
                 self._create_widget_item(child_node, parent_item)
 
+    def _defer(self, node, item):
+        self.pending[id(item)] = (node, item)
+        if len(node.get_children()) > 0:
+            QTreeWidgetItem(item)
+
+    def item_expanded(self, item):
+        self.materialize(item)
+
+    def materialize(self, item):
+        """Create the children of a subsection item that was deferred in lazy mode"""
+        info = self.pending.pop(id(item), None)
+        if info is None:
+            return
+        node, _ = info
+        item.takeChildren()
+        self._populate_children(node, item)
+        self.hide_hidden(node)
+        if self.search_index is not None:
+            for child in node.get_children():
+                if self.search_index.is_filtered(child):
+                    self.items.get(child)[1].setHidden(True)
+        self.check_all_dependencies()
+
+    def get_node_item(self, node):
+        # Creates the items of the subsections above node if needed (lazy mode)
+        info = self.items.get(node)
+        if info is None and node.father is not None and node.father is not self.node:
+            father_item = self.get_node_item(node.father)
+            if father_item is not None:
+                self.materialize(father_item)
+                info = self.items.get(node)
+        return None if info is None else info[1]
+
+    def _apply_filter(self, text):
+        hide, show, expand = self.get_search_index().filter(text)
+        for node in expand:
+            item = self.get_node_item(node)
+            if item is not None and not item.isExpanded():
+                item.setExpanded(True)
+        for node in show:
+            self._set_node_hidden(node, False)
+        for node in hide:
+            self._set_node_hidden(node, True)
+        # Sizing the column takes longer than filtering: done once the user stops typing
+        self.search_timer.start()
+
+    def _show_filtered(self, nodes):
+        for node in nodes:
+            self._set_node_hidden(node, False)
+
+    def _set_node_hidden(self, node, hidden):
+        info = self.items.get(node)
+        if info is not None:
+            info[1].setHidden(hidden)
+
+    def count_sections(self, node):
+        """Number of entries that the subtree of a node takes in the collapsed string"""
+        if not isinstance(node, EasySubsection) or len(node.get_children()) == 0:
+            return 0
+        return 1 + sum(self.count_sections(child) for child in node.get_children())
+
     def get_collapsed_items(self):
+        if self.search_state is not None:
+            # As it was before filtering
+            return self.search_state
         info = []
 
         def traverse(item):
+            pending = self.pending.get(id(item))
+            if pending is not None:
+                # Not materialized: the whole subtree is collapsed
+                info.append("0" * self.count_sections(pending[0]))
+                return
+
             if item.childCount() == 0:
                 return
 
@@ -131,6 +318,15 @@ class EasyTree(QTreeWidget):
         info = list(info)
 
         def traverse(item, info2):
+            pending = self.pending.get(id(item))
+            if pending is not None:
+                count = self.count_sections(pending[0])
+                if "1" not in info2[:count]:
+                    # Stays collapsed, no need to create the children
+                    del info2[:count]
+                    return
+                self.materialize(item)
+
             if item.childCount() == 0:
                 return
             if len(info2) == 0:
@@ -142,26 +338,33 @@ class EasyTree(QTreeWidget):
 
         traverse(self.invisibleRootItem(), info)
 
-    def check_all_dependencies(self):
-        is_ok = True
-        for node, deps in self.dependencies.items():
-            is_ok = is_ok and self.check_node_dependencies(deps)
-        self.config_ok.emit(is_ok)
+    def get_node_value(self, node):
+        # Use the value of the widget if it exists, otherwise (lazy mode)
+        # the node has not been edited and its value is the current one
+        info = self.items.get(node)
+        if info is None or info[0] is None:
+            return node.value
+        return info[0].get_value()
 
     def check_node_dependencies(self, deps):
         # print("checking deps")
         conf_is_ok = True
         for dep in deps:
-            widget1, item1 = self.items.get(dep.master)
+            info1 = self.items.get(dep.master)
             if isinstance(dep, EasyPairDependency):
-                ok = dep.call(widget1.get_value())
+                ok = dep.call(self.get_node_value(dep.master))
                 for slave in dep.get_slave():
-                    widget2, item2 = self.items.get(slave)
-                    widget2.set_enabled(ok)
+                    info2 = self.items.get(slave)
+                    if info2 is not None:
+                        widget2, item2 = info2
+                        widget2.set_enabled(ok)
             elif isinstance(dep, EasyMandatoryDependency):
-                if not dep.call(widget1.get_value()):
+                ok = dep.call(self.get_node_value(dep.master))
+                self.dependency_state.update(dep, ok)
+                if not ok:
                     conf_is_ok = False
-                    item1.setForeground(0, Qt.red)
-                else:
-                    item1.setForeground(0, Qt.black)
+                    if info1 is not None:
+                        info1[1].setForeground(0, Qt.red)
+                elif info1 is not None:
+                    info1[1].setForeground(0, Qt.black)
         return conf_is_ok
@@ -0,0 +1,94 @@
+from PyQt5.QtCore import QTimer, QThread
+
+from easyconfig2.easysearch import EasySearchIndex
+
+# Milliseconds without filtering before the label column is sized to the nodes shown
+RESIZE_DELAY = 150
+
+
+def is_own_thread(qobject):
+    """Whether the calling thread is the one of qobject. The nodes notify
+    their changes in the thread setting them (e.g. the autosave or the
+    application threads), while the views must be updated in theirs"""
+    return QThread.currentThread() is qobject.thread()
+
+
+class EasyTreeMixin:
+    """Filtering, collapsed state and dependency checking shared by EasyTree
+    and EasyModelTree. The trees implement _apply_filter(text), which shows
+    only the nodes matching text, _show_filtered(nodes), which shows again
+    the nodes hidden by the filter, and check_node_dependencies(deps)"""
+
+    def init_search(self):
+        # See filter: built on the first search, and the collapsed
+        # state to restore (None when not filtering)
+        self.search_index = None
+        self.search_text = ""
+        self.search_state = None
+        self.search_width = 0
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(RESIZE_DELAY)
+        self.search_timer.timeout.connect(self.resize_filtered)
+
+    def connect_expansion(self):
+        # Connected once the first level is expanded, so the
+        # collapsed state is stored and the column resized only once
+        self.expanded.connect(self.tree_expanded)
+        self.collapsed.connect(self.tree_expanded)
+        self.expanded.connect(self.resize_labels)
+        self.tree_expanded()
+
+    def tree_expanded(self):
+        # The subsections expanded by the filter are not stored
+        if self.search_state is None:
+            self.node.get_node("easyconfig/collapsed").set(self.get_collapsed_items())
+
+    def resize_labels(self):
+        # While filtering, resized once all the subsections are expanded
+        if self.search_state is None:
+            self.resizeColumnToContents(0)
+
+    def filter(self, text):
+        """Show only the nodes whose key, pretty label or path contains text
+        (ignoring case), expanding their subsections. An empty text shows
+        all the nodes again and restores the collapsed state"""
+        self.search_text = text
+        if text:
+            if self.search_state is None:
+                self.search_state = self.get_collapsed_items()
+                self.search_width = self.columnWidth(0)
+            self._apply_filter(text)
+        elif self.search_state is not None:
+            self._show_filtered(self.search_index.clear())
+            # Still filtering: the state restored is not stored again
+            self.set_collapsed_items(self.search_state)
+            self.search_state = None
+            self.search_timer.stop()
+            self.setColumnWidth(0, self.search_width)
+
+    def get_search_index(self):
+        if self.search_index is None:
+            self.search_index = EasySearchIndex(self.node)
+        return self.search_index
+
+    def resize_filtered(self):
+        if self.search_state is not None and self.search_index.is_narrow():
+            self.resizeColumnToContents(0)
+
+    def check_all_dependencies(self):
+        self.dependency_state.clear()
+        for node, deps in self.dependencies.items():
+            self.check_node_dependencies(deps)
+        self.last_ok = self.dependency_state.is_ok()
+        self.config_ok.emit(self.last_ok)
+
+    def check_dependencies(self, node):
+        """Evaluate only the dependencies whose master is node"""
+        deps = self.dependencies.get(node)
+        if deps is None:
+            return
+        self.check_node_dependencies(deps)
+        if self.dependency_state.is_ok() != self.last_ok:
+            self.last_ok = self.dependency_state.is_ok()
+            self.config_ok.emit(self.last_ok)
@@ -0,0 +1,135 @@
+import hashlib
+import os
+import sys
+import threading
+
+from easyconfig2.easydocument import document_cache
+
+
+class EasyFileWatcher:
+    """Calls callback when the content of a file changes. The file is read
+    and hashed only if its modification time or size change, so touching it
+    or rewriting the same content does not trigger the callback, and neither
+    do the writes of this process (the saves of the configurations).
+    If a Qt application is running a QFileSystemWatcher is used, otherwise
+    the file is polled every interval seconds from a thread. Either way the
+    callback is called in the Qt thread if a Qt application is running when
+    the change is found (the nodes update their widgets), otherwise in the
+    polling thread"""
+
+    def __init__(self, filename, callback, interval=1.0):
+        self.filename = os.path.abspath(filename)
+        self.callback = callback
+        self.interval = interval
+        self.signature = self.get_signature()
+        self.digest = self.get_digest()
+        self.qt_watcher = None
+        self.thread = None
+        # Hands the callback over to the Qt thread (see call_callback)
+        self.invoker = None
+        self.stopped = threading.Event()
+
+        if is_qt_running():
+            from PyQt5.QtCore import QFileSystemWatcher
+            # The directory is watched too: editors usually replace the file
+            self.qt_watcher = QFileSystemWatcher([os.path.dirname(self.filename)])
+            if os.path.exists(self.filename):
+                self.qt_watcher.addPath(self.filename)
+            self.qt_watcher.fileChanged.connect(self.qt_changed)
+            self.qt_watcher.directoryChanged.connect(self.qt_changed)
+        else:
+            self.thread = threading.Thread(target=self.run, name="easyconfig-watcher", daemon=True)
+            self.thread.start()
+
+    def get_signature(self):
+        try:
+            stat = os.stat(self.filename)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def get_digest(self):
+        try:
+            with open(self.filename, "rb") as f:
+                return hashlib.sha1(f.read()).digest()
+        except FileNotFoundError:
+            return None
+
+    def check(self):
+        signature = self.get_signature()
+        if signature == self.signature:
+            return False
+        self.signature = signature
+        digest = self.get_digest()
+        if digest == self.digest or digest is None:
+            return False
+        self.digest = digest
+        if document_cache.is_written(self.filename, signature):
+            # Saved by this process: reloading would undo the values set since
+            return False
+        self.call_callback()
+        return True
+
+    def call_callback(self):
+        if not is_qt_running() or is_qt_thread():
+            self.callback()
+            return
+        if self.invoker is None:
+            self.invoker = get_invoker()
+        # Queued: the callback runs in the Qt thread, unless stopped meanwhile
+        self.invoker.invoke.emit(self.call_if_running)
+
+    def call_if_running(self):
+        if not self.stopped.is_set():
+            self.callback()
+
+    def qt_changed(self, path):
+        if self.filename not in self.qt_watcher.files() and os.path.exists(self.filename):
+            self.qt_watcher.addPath(self.filename)
+        self.check()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.check()
+
+    def stop(self):
+        self.stopped.set()
+        if self.qt_watcher is not None:
+            self.qt_watcher.fileChanged.disconnect(self.qt_changed)
+            self.qt_watcher.directoryChanged.disconnect(self.qt_changed)
+            self.qt_watcher = None
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+
+
+def is_qt_running():
+    if "PyQt5.QtCore" not in sys.modules:
+        return False
+    from PyQt5.QtCore import QCoreApplication
+    return QCoreApplication.instance() is not None
+
+
+def is_qt_thread():
+    from PyQt5.QtCore import QCoreApplication, QThread
+    return QThread.currentThread() is QCoreApplication.instance().thread()
+
+
+def get_invoker():
+    """QObject living in the Qt thread that calls the functions emitted by
+    its invoke signal from another thread in the Qt thread"""
+    from PyQt5.QtCore import QObject, QCoreApplication, pyqtSignal, pyqtSlot
+
+    class EasyInvoker(QObject):
+        invoke = pyqtSignal(object)
+
+        def __init__(self):
+            super().__init__()
+            self.invoke.connect(self.call)
+
+        @pyqtSlot(object)
+        def call(self, function):
+            function()
+
+    invoker = EasyInvoker()
+    invoker.moveToThread(QCoreApplication.instance().thread())
+    return invoker
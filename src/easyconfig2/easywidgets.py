@@ -1,10 +1,11 @@
-from PyQt5.QtCore import pyqtSignal, Qt
-from PyQt5.QtGui import QDoubleValidator, QValidator, QIntValidator, QFontMetrics, QFont
+from PyQt5.QtCore import pyqtSignal, Qt, QAbstractListModel, QModelIndex, QStringListModel, QTimer, QEvent
+from PyQt5.QtGui import QDoubleValidator, QValidator, QIntValidator, QFontMetrics, QFont, QKeySequence
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLineEdit, QPushButton, \
-    QCheckBox, QComboBox, QSlider, QHBoxLayout, QLabel, QSizePolicy, QStyle, QFileDialog, QListWidget, QMessageBox, \
-    QPlainTextEdit
+    QCheckBox, QComboBox, QSlider, QHBoxLayout, QLabel, QSizePolicy, QStyle, QFileDialog, QListView, QMessageBox, \
+    QPlainTextEdit, QAbstractItemView, QShortcut, QApplication, QCompleter
 
 from easyconfig2.easydialog import InputDialog
+from easyconfig2.easynodes import PROPAGATIONS
 from easyconfig2.easyutils import get_validator_type, get_validator_from_type
 
 
@@ -18,7 +19,12 @@ class EasyWidget(QWidget):
         self.setLayout(self.h_layout)
         self.default = value if value is not None else kwargs.get("default")
         self.enabled = kwargs.get("enabled", True)
-        self.list_widget = None
+        self.propagation = kwargs.get("propagation", "immediate")
+        if self.propagation not in PROPAGATIONS:
+            raise ValueError("Invalid propagation")
+        self.propagation_delay = kwargs.get("propagation_delay", 300)
+        self.pending = False
+        self.timer = None
 
     def is_ok(self):
         return True
@@ -29,8 +35,49 @@ class EasyWidget(QWidget):
     def set_value(self, value):
         pass
 
+    def is_editing(self):
+        # The user is in the middle of a change, see the "release" propagation
+        return False
+
+    def get_timer(self):
+        if self.timer is None:
+            self.timer = QTimer(self)
+            self.timer.setSingleShot(True)
+            self.timer.setInterval(self.propagation_delay)
+            self.timer.timeout.connect(self.timer_expired)
+        return self.timer
+
     def value_changed(self):
-        self.widget_value_changed.emit(self)
+        if self.propagation == "immediate":
+            self.widget_value_changed.emit(self)
+        elif self.propagation == "debounce":
+            self.pending = True
+            self.get_timer().start()
+        elif self.propagation == "rate":
+            if self.get_timer().isActive():
+                self.pending = True
+            else:
+                self.widget_value_changed.emit(self)
+                self.timer.start()
+        elif self.is_editing():
+            self.pending = True
+        else:
+            self.widget_value_changed.emit(self)
+
+    def timer_expired(self):
+        if self.pending:
+            self.pending = False
+            self.widget_value_changed.emit(self)
+            if self.propagation == "rate":
+                self.timer.start()
+
+    def flush(self):
+        """Propagate at once the change not propagated yet, if any"""
+        if self.timer is not None:
+            self.timer.stop()
+        if self.pending:
+            self.pending = False
+            self.widget_value_changed.emit(self)
 
     def set_enabled(self, enabled):
         pass
@@ -48,6 +95,10 @@ class EasySubsectionWidget(EasyWidget):
     def add_child_widget(self, child):
         self.children.append(child)
 
+    def remove_child_widget(self, child):
+        if child in self.children:
+            self.children.remove(child)
+
     def set_enabled(self, enabled):
         for child in self.children:
             child.set_enabled(enabled)
@@ -151,13 +202,21 @@ class EasyEditBoxWidget(EasyWidget):
 
         self.widget.setReadOnly(self.readonly)
         self.widget.textChanged.connect(self.value_changed)
+        self.widget.installEventFilter(self)
 
         self.set_value(self.default)
 
+    def eventFilter(self, obj, event):
+        if obj is self.widget and event.type() == QEvent.FocusOut:
+            self.flush()
+        return super().eventFilter(obj, event)
+
+    def is_editing(self):
+        return self.widget.hasFocus()
+
     def get_value(self):
-        if self.widget.toPlainText() != "":
-            return self.widget.toPlainText()
-        return None
+        text = self.widget.toPlainText()
+        return text if text != "" else None
 
     def set_value(self, value):
         self.widget.blockSignals(True)
@@ -221,6 +280,7 @@ class EasySliderWidget(EasyWidget):
 
         self.slider.setValue(int(self.default if self.default is not None else 0))
         self.slider.valueChanged.connect(self.value_changed)
+        self.slider.sliderReleased.connect(self.flush)
         self.text.setAlignment(Qt.AlignRight | Qt.AlignVCenter)
         text = str(self.slider.maximum() / self.den)
         max_value_formatted = format(float(text), self.format) + self.suffix
@@ -245,6 +305,9 @@ class EasySliderWidget(EasyWidget):
         self.slider.blockSignals(False)
         self.update_text()
 
+    def is_editing(self):
+        return self.slider.isSliderDown()
+
     def value_changed(self):
         super().value_changed()
         self.update_text()
@@ -256,20 +319,85 @@ class EasySliderWidget(EasyWidget):
         self.slider.setEnabled(enabled)
 
 
+class EasyItemsModel(QAbstractListModel):
+    """Read-only model over the items of a combo box: the list is not copied
+    and only the rows shown in the popup are rendered"""
+
+    def __init__(self, items, parent=None):
+        super().__init__(parent)
+        self.items = items
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.items)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return str(self.items[index.row()])
+        return None
+
+
 class EasyComboBoxWidget(EasyWidget):
+    # Combo boxes with more items can be filtered by typing
+    FILTER_ITEMS = 100
+
     class MyComboBox(QComboBox):
         def wheelEvent(self, e):
             e.ignore()
 
     def __init__(self, value, **kwargs):
         super().__init__(value, **kwargs)
+        items = kwargs.get("items", [])
+        self.find_items = kwargs.get("find_items")
+        self.matches = []
         self.widget = self.MyComboBox()
-        self.widget.addItems(kwargs.get("items", []))
+        self.widget.setModel(EasyItemsModel(items, self.widget))
+        # The popup lays out only the rows shown, and the width of
+        # the combo box is not measured on all the items
+        self.widget.view().setUniformItemSizes(True)
+        if len(items) > self.FILTER_ITEMS:
+            self.widget.setSizeAdjustPolicy(QComboBox.AdjustToMinimumContentsLengthWithIcon)
+            self.widget.setMinimumContentsLength(20)
         self.widget.setEnabled(self.enabled)
         self.widget.setCurrentIndex(self.default if self.default is not None else 0)
+
+        filtered = kwargs.get("filter")
+        if filtered is None:
+            filtered = len(items) > self.FILTER_ITEMS
+        if filtered and self.find_items is not None:
+            self.set_filter()
+
         self.widget.currentIndexChanged.connect(self.value_changed)
         self.layout().addWidget(self.widget)
 
+    def set_filter(self):
+        # The text typed is looked up with find_items (an index of the items)
+        # and the matches are offered by a completer
+        self.widget.setEditable(True)
+        self.widget.setInsertPolicy(QComboBox.NoInsert)
+        self.completer = QCompleter(self)
+        self.completer.setModel(QStringListModel(self.completer))
+        self.completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.completer.activated[QModelIndex].connect(self.match_activated)
+        self.widget.lineEdit().setCompleter(self.completer)
+        self.widget.lineEdit().textEdited.connect(self.filter_items)
+        self.widget.lineEdit().editingFinished.connect(self.restore_text)
+
+    def filter_items(self, text):
+        items = self.widget.model().items
+        self.matches = self.find_items(text) if text else []
+        self.completer.model().setStringList([str(items[i]) for i in self.matches])
+        if self.matches:
+            self.completer.complete()
+
+    def match_activated(self, index):
+        if 0 <= index.row() < len(self.matches):
+            self.widget.setCurrentIndex(self.matches[index.row()])
+        self.restore_text()
+
+    def restore_text(self):
+        # Text not matching an item is discarded
+        self.widget.setEditText(self.widget.itemText(self.widget.currentIndex()))
+
     def get_value(self):
         return self.widget.currentIndex()
 
@@ -328,6 +456,76 @@ class EasyFileDialogWidget(EasyWidget):
         self.widget.setText(value)
 
 
+class EasyListModel(QAbstractListModel):
+    """Model over a Python list, rendered by a QListView only for the rows
+    shown. The list is not copied: it is shared with whoever set it or got
+    it (the node) and copied only before the first change after that"""
+
+    def __init__(self, values=None, parent=None):
+        super().__init__(parent)
+        self.values = []
+        self.shared = False
+        self.set_values(values)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.values)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role in (Qt.DisplayRole, Qt.ToolTipRole):
+            return str(self.values[index.row()])
+        return None
+
+    def set_values(self, values):
+        self.beginResetModel()
+        self.values = values if values is not None else []
+        self.shared = values is not None
+        self.endResetModel()
+
+    def get_values(self):
+        self.shared = True
+        return self.values
+
+    def get_value(self, row):
+        return self.values[row]
+
+    def own(self):
+        if self.shared:
+            self.values = list(self.values)
+            self.shared = False
+
+    def add_values(self, values):
+        if not values:
+            return
+        self.own()
+        row = len(self.values)
+        self.beginInsertRows(QModelIndex(), row, row + len(values) - 1)
+        self.values.extend(values)
+        self.endInsertRows()
+
+    def set_value(self, row, value):
+        self.own()
+        self.values[row] = value
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+
+    def remove_rows(self, rows):
+        rows = sorted(set(rows))
+        if not rows:
+            return
+        if rows[-1] - rows[0] + 1 == len(rows):
+            self.own()
+            self.beginRemoveRows(QModelIndex(), rows[0], rows[-1])
+            del self.values[rows[0]:rows[-1] + 1]
+            self.endRemoveRows()
+        else:
+            # Scattered rows: a new list and a single reset
+            removed = set(rows)
+            self.beginResetModel()
+            self.values = [value for row, value in enumerate(self.values) if row not in removed]
+            self.shared = False
+            self.endResetModel()
+
+
 class EasyBasicListWidget(EasyWidget):
     def __init__(self, value, **kwargs):
         super().__init__(value, **kwargs)
@@ -335,6 +533,7 @@ class EasyBasicListWidget(EasyWidget):
         self.widget_height = kwargs.get("height", 50)
         self.editable = kwargs.get("editable", True)
         self.type = str
+        self.validator = None
 
         layout = QVBoxLayout()
         layout.setContentsMargins(0, 0, 0, 0)
@@ -363,55 +562,106 @@ class EasyBasicListWidget(EasyWidget):
         h_layout.addWidget(button_del)
         h_layout.setAlignment(Qt.AlignLeft)
 
-        self.list_widget = QListWidget()
-        layout.addWidget(self.list_widget)
-
+        # The view only renders the rows shown and all of them
+        # have the same height, so the list can be very long
+        self.list_model = EasyListModel(self.default, self)
+        self.list_view = QListView()
+        self.list_view.setModel(self.list_model)
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.list_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        layout.addWidget(self.list_view)
+
+        shortcuts = [(QKeySequence.Copy, self.copy_items)]
         if self.editable:
             layout.addLayout(h_layout)
+            shortcuts += [(QKeySequence.Paste, self.paste_items), (QKeySequence.Delete, self.del_item)]
+        for key, slot in shortcuts:
+            QShortcut(key, self.list_view, slot, context=Qt.WidgetShortcut)
 
-        if self.default is not None:
-            self.list_widget.addItems([str(i) for i in self.default])
-        self.list_widget.setFont(QFont("Courier New", 10))
-        self.list_widget.setMaximumHeight(self.widget_height)
+        self.list_view.setFont(QFont("Courier New", 10))
+        self.list_view.setMaximumHeight(self.widget_height)
 
         self.layout().addWidget(self.widget)
 
+    def get_current_text(self):
+        index = self.list_view.currentIndex()
+        return str(self.list_model.get_value(index.row())) if index.isValid() else ""
+
+    def get_selected_rows(self):
+        return [index.row() for index in self.list_view.selectionModel().selectedRows()]
+
     def ask_value(self):  # retry submit
-        current = self.list_widget.currentItem().text() if self.list_widget.currentItem() is not None else ""
-        dialog = InputDialog(current)
+        dialog = InputDialog(self.get_current_text())
         if dialog.exec_():
             return dialog.input.text()
         return None
 
-    def add_item(self):
+    def ask_values(self):
         value = self.ask_value()
-        if value is not None:
-            self.list_widget.addItem(str(value))
+        return [] if value is None else [value]
+
+    def convert(self, texts):
+        # Entries that are not valid for the type of the list are skipped
+        values = []
+        for text in texts:
+            if self.validator is not None and self.validator.validate(text, 0)[0] != QValidator.Acceptable:
+                continue
+            try:
+                values.append(self.type(text))
+            except ValueError:
+                pass
+        return values
+
+    def add_values(self, values):
+        """Append many values at once"""
+        if values:
+            self.list_model.add_values(values)
             self.widget_value_changed.emit(self)
 
+    def remove_rows(self, rows):
+        if rows:
+            self.list_model.remove_rows(rows)
+            self.widget_value_changed.emit(self)
+
+    def add_item(self):
+        self.add_values(self.convert(self.ask_values()))
+
     def del_item(self):
+        rows = self.get_selected_rows()
+        if not rows:
+            return
         reply = QMessageBox.question(None, "Confirm", "Are you sure?",
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.No:
             return
-        if self.list_widget.currentItem():
-            self.list_widget.takeItem(self.list_widget.currentRow())
-            self.widget_value_changed.emit(self)
+        self.remove_rows(rows)
 
     def edit_item(self):
-        if self.list_widget.currentItem():
+        index = self.list_view.currentIndex()
+        if index.isValid():
             value = self.ask_value()
-            if value:
-                self.list_widget.currentItem().setText(value)
+            values = self.convert([value]) if value else []
+            if values:
+                self.list_model.set_value(index.row(), values[0])
                 self.widget_value_changed.emit(self)
 
+    def copy_items(self):
+        rows = sorted(self.get_selected_rows())
+        text = "\n".join(str(self.list_model.get_value(row)) for row in rows)
+        QApplication.clipboard().setText(text)
+
+    def paste_items(self):
+        # One entry per line
+        lines = [line for line in QApplication.clipboard().text().splitlines() if line.strip()]
+        self.add_values(self.convert(lines))
+
     def get_value(self):
-        return [self.type(self.list_widget.item(i).text()) for i in range(self.list_widget.count())]
+        # The list itself, copied only if the widget changes it afterwards
+        return self.list_model.get_values()
 
     def set_value(self, value):
-        self.list_widget.clear()
-        if value is not None:
-            self.list_widget.addItems(value)
+        self.list_model.set_values(value)
 
 
 class EasyListWidget(EasyBasicListWidget):
@@ -436,8 +686,7 @@ class EasyListWidget(EasyBasicListWidget):
                 raise ValueError("Mixed types in default list")
 
     def ask_value(self):  # retry submit
-        current = self.list_widget.currentItem().text() if self.list_widget.currentItem() is not None else ""
-        dialog = InputDialog(current, self.validator)
+        dialog = InputDialog(self.get_current_text(), self.validator)
         if dialog.exec_():
             return dialog.input.text()
         return None
@@ -451,7 +700,7 @@ class EasyFileListWidget(EasyBasicListWidget):
             raise ValueError("Invalid type")
 
     def ask_value(self):
-        current = self.list_widget.currentItem().text() if self.list_widget.currentItem() is not None else ""
+        current = self.get_current_text()
         if self.kind == "file":
             file, ok = QFileDialog.getOpenFileName(self, "Open File", current)
         elif self.kind == "dir":
@@ -463,3 +712,10 @@ class EasyFileListWidget(EasyBasicListWidget):
         if ok and file:
             return file
         return None
+
+    def ask_values(self):
+        # Several files can be added at once
+        if self.kind == "file":
+            files, _ = QFileDialog.getOpenFileNames(self, "Open Files", self.get_current_text())
+            return files
+        return super().ask_values()
@@ -2,17 +2,30 @@ class TripleDict:
     def __init__(self):
         self.dict1 = {}
         self.dict2 = {}
+        # QTreeWidgetItem is not hashable, indexed by id()
+        self.dict3 = {}
 
     def add(self, node, widget, item):
         self.dict1[node] = (widget, item)
         self.dict2[widget] = (node, item)
+        self.dict3[id(item)] = (node, widget)
 
     def get(self, key):
         return self.dict1.get(key, self.dict2.get(key, None))
 
+    def get_by_item(self, item):
+        return self.dict3.get(id(item), None)
+
+    def remove(self, node):
+        widget, item = self.dict1.pop(node)
+        if self.dict2.get(widget, (None, None))[0] is node:
+            del self.dict2[widget]
+        self.dict3.pop(id(item), None)
+
     def clear(self):
         self.dict1.clear()
         self.dict2.clear()
+        self.dict3.clear()
 
     def __getitem__(self, item):
         return self.get(item)